@@ -4,9 +4,16 @@ Author: Matt Christie, 2015-2016
 Cache function calls.
 """
 
+import os
+import sys
+import json
 import time
-
-from priority_queue import PriorityQueue
+import errno
+import sqlite3
+import threading
+import heapq
+import itertools as it
+import collections as cl
 
 
 def is_iterable(item):
@@ -23,78 +30,417 @@ def argument_key(args, kwargs):
 	return args, tuple(sorted(kwargs.iteritems()))
 
 
-def memoized(func):
+def sizeof(obj, seen=None):
+	"""Estimate the bytes an object takes, counting what it holds."""
+	# Follows containers and __slots__; objects reached twice count once.
+	if seen == None:
+		seen = set()
+	if id(obj) in seen:
+		return 0
+	seen.add(id(obj))
+	size = sys.getsizeof(obj)
+	if isinstance(obj, dict):
+		size += sum(sizeof(k, seen) + sizeof(v, seen) for k, v in obj.iteritems())
+	elif isinstance(obj, (list, tuple, set, frozenset)):
+		size += sum(sizeof(item, seen) for item in obj)
+	elif hasattr(obj, '__slots__'):
+		for name in obj.__slots__:
+			size += sizeof(getattr(obj, name, None), seen)
+	return size
+
+
+class GreedyDualCache(object):
+	"""A cache holding values up to some number of bytes in total."""
+	# Evicts by GreedyDual-Size: a value's priority is L + cost / size,
+	# where the inflation L is the priority of the last value evicted, and
+	# is renewed whenever the value is used. Values that are small and
+	# costly to recompute stay longest. Stale heap entries are skipped.
+	
+	def __init__(self, budget, sizer=sizeof):
+		self.entries = {}  # key -> [priority, serial, size, cost, value]
+		self.heap = []
+		self.budget = budget
+		self.sizer = sizer
+		self.nbytes = 0
+		self.inflation = 0.0
+		self.evictions = 0
+		self.serials = it.count()
+	
+	def touch(self, key):
+		"""Renew the priority of a value in the cache."""
+		entry = self.entries[key]
+		entry[0] = self.inflation + float(entry[3]) / max(entry[2], 1)
+		entry[1] = next(self.serials)
+		heapq.heappush(self.heap, (entry[0], entry[1], key))
+		if len(self.heap) > 2 * len(self.entries) + 16:
+			self.heap = [(e[0], e[1], k) for k, e in self.entries.iteritems()]
+			heapq.heapify(self.heap)
+	
+	def insert(self, key, value, cost):
+		"""Insert a value that cost some amount to compute, if it fits."""
+		size = self.sizer(key) + self.sizer(value)
+		if size > self.budget:
+			return False
+		if key in self.entries:
+			self.remove(key)
+		while self.nbytes + size > self.budget:
+			self.evict()
+		self.entries[key] = [0.0, None, size, cost, value]
+		self.nbytes += size
+		self.touch(key)
+		return True
+	
+	def evict(self):
+		"""Evict the value with the least priority."""
+		while True:
+			priority, serial, key = heapq.heappop(self.heap)
+			entry = self.entries.get(key)
+			if entry != None and entry[1] == serial:
+				break
+		self.inflation = priority
+		self.remove(key)
+		self.evictions += 1
+	
+	def remove(self, key):
+		"""Remove a value from the cache."""
+		entry = self.entries.pop(key)
+		self.nbytes -= entry[2]
+	
+	def __len__(self):
+		return len(self.entries)
+	
+	def __contains__(self, key):
+		return key in self.entries
+	
+	def __getitem__(self, key):
+		return self.entries[key][4]
+
+
+MemoInfo = cl.namedtuple('MemoInfo', ['hits', 'misses', 'evictions', 'size', 'nbytes', 'budget'])
+
+
+def memoized(func=None, budget=None, sizer=sizeof, cost=None):
 	"""Memoize a function with immutable arguments."""
-	# Modeled after Python 3's functools.lru_cache with maxsize=None
-	past_calls = {}
+	# Without a budget, every call is kept, as with Python 3's
+	# functools.lru_cache with maxsize=None. With a budget in bytes,
+	# values are sized by sizer and evicted by GreedyDual-Size, where a
+	# value's cost is cost(value), or the seconds it took to compute.
+	# The memoized function's cache_info() reports the cache's footprint.
+	if func == None:
+		return lambda func: memoized(func, budget=budget, sizer=sizer, cost=cost)
+	if budget == None:
+		past_calls = {}
+	else:
+		past_calls = GreedyDualCache(budget, sizer=sizer)
+	stats = {'hits': 0, 'misses': 0}
 	def memoized_func(*args, **kwargs):
 		ak = argument_key(args, kwargs)
-		if ak not in past_calls:
-			past_calls[ak] = func(*args, **kwargs)
-		return past_calls[ak]
+		if ak in past_calls:
+			stats['hits'] += 1
+			if budget != None:
+				past_calls.touch(ak)
+			return past_calls[ak]
+		stats['misses'] += 1
+		start = time.time()
+		value = func(*args, **kwargs)
+		if budget == None:
+			past_calls[ak] = value
+		else:
+			spent = cost(value) if cost != None else time.time() - start
+			past_calls.insert(ak, value, spent)
+		return value
+	def cache_info():
+		"""Statistics on how well the cache is doing and how much it holds."""
+		if budget == None:
+			return MemoInfo(stats['hits'], stats['misses'], 0, len(past_calls), None, None)
+		return MemoInfo(stats['hits'], stats['misses'], past_calls.evictions,
+		                len(past_calls), past_calls.nbytes, budget)
+	memoized_func.cache = past_calls
+	memoized_func.cache_info = cache_info
+	memoized_func.__name__ = func.__name__
+	memoized_func.__doc__ = func.__doc__
 	return memoized_func
 
 
+# Links of an LRUCache's list of entries
+PREV, NEXT, KEY, VALUE = 0, 1, 2, 3
+
+
 class LRUCache(object):
 	"""A least-recently-used cache."""
+	# Entries live in a dict and in a circular doubly linked list, most
+	# recently used first, so lookups, moves and evictions are all O(1).
 	
 	def __init__(self, maxsize=100):
 		self.items = {}
-		self.oldest = PriorityQueue(key=lambda item: item['timestamp'])
+		self.root = []
+		self.root[:] = [self.root, self.root, None, None]
 		self.maxsize = maxsize
-		self.numitems = 0
+		self.evictions = 0
 	
 	def insert(self, key, value):
 		"""Insert a piece of data into the cache."""
-		if self.numitems >= self.maxsize:
-			throw_away = self.oldest.get()
-			del self.items[throw_away['key']]
-			self.numitems -= 1
-		pq_data = {'key': key, 'timestamp': time.time()}
-		self.items[key] = {
-			'index': self.oldest.put(pq_data),
-			'value': value
-		}
-		self.numitems += 1
+		if key in self.items:
+			self.remove(key)
+		if len(self.items) >= self.maxsize:
+			oldest = self.root[PREV]
+			self.remove(oldest[KEY])
+			self.evictions += 1
+		first = self.root[NEXT]
+		link = [self.root, first, key, value]
+		first[PREV] = self.root[NEXT] = self.items[key] = link
 	
 	def update(self, key):
-		"""Update the timestamp of a piece of data in the cache."""
-		index = self.items[key]['index']
-		self.oldest[index]['timestamp'] = time.time()
-		self.oldest.heap.heapify_down(index)
+		"""Mark a piece of data in the cache as the most recently used."""
+		link = self.items[key]
+		link[PREV][NEXT], link[NEXT][PREV] = link[NEXT], link[PREV]
+		first = self.root[NEXT]
+		link[PREV], link[NEXT] = self.root, first
+		first[PREV] = self.root[NEXT] = link
 	
 	def remove(self, key):
 		"""Remove a piece of data from the cache."""
-		index = self.items[key]['index']
-		thrown_away = self.oldest.delete(index)
-		del self.items[key]
-		self.numitems -= 1
+		link = self.items.pop(key)
+		link[PREV][NEXT], link[NEXT][PREV] = link[NEXT], link[PREV]
+	
+	@property
+	def numitems(self):
+		"""The number of pieces of data in the cache."""
+		return len(self.items)
+	
+	def __len__(self):
+		return len(self.items)
 	
 	def __contains__(self, key):
 		return key in self.items
 	
 	def __getitem__(self, key):
-		return self.items[key]['value']
+		return self.items[key][VALUE]
+
 
+CacheInfo = cl.namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'size', 'maxsize'])
 
-# Max number of elements that an LRUCache will hold.
-# Consider making this a decorator argument.
+
+# Default max number of elements that an LRUCache made by lru_cache will hold.
 cachesize = 720
 
 
-def lru_cache(func, include_nones=True):
+def lru_cache(func=None, maxsize=cachesize, include_nones=True):
 	"""Cache values of a function with immutable arguments."""
-	cache = LRUCache(maxsize=cachesize)
+	# Works bare, as @lru_cache, or with arguments, as @lru_cache(maxsize=...).
+	# The cached function's cache_info() counts hits, misses and evictions.
+	if func == None:
+		return lambda func: lru_cache(func, maxsize=maxsize, include_nones=include_nones)
+	cache = LRUCache(maxsize=maxsize)
+	stats = {'hits': 0, 'misses': 0}
 	def cached(*args, **kwargs):
 		key = argument_key(args, kwargs)
 		if key in cache:
+			stats['hits'] += 1
 			cache.update(key)
 			return cache[key]
+		stats['misses'] += 1
 		value = func(*args, **kwargs)
 		if include_nones or value != None:
 			cache.insert(key, value)
 		return value
+	def cache_info():
+		"""Statistics on how well the cache is doing."""
+		return CacheInfo(stats['hits'], stats['misses'], cache.evictions, len(cache), maxsize)
+	cached.cache = cache
+	cached.cache_info = cache_info
+	cached.__name__ = func.__name__
+	cached.__doc__ = func.__doc__
 	return cached
 
 
+class PersistentCache(object):
+	"""Results kept in an SQLite file, so that they outlive a run."""
+	# Keys and values are anything JSON can encode; keys are stored as
+	# their JSON strings, so lists and tuples are the same key. Writes
+	# are committed every commit_every puts and on close.
+	
+	def __init__(self, path, commit_every=100):
+		self.conn = sqlite3.connect(path)
+		self.conn.execute('CREATE TABLE IF NOT EXISTS Result (key TEXT PRIMARY KEY, value TEXT)')
+		self.commit_every = commit_every
+		self.pending = 0
+		self.hits = 0
+		self.misses = 0
+	
+	def get(self, key, default=None):
+		"""The value stored for a key, or default if there is none."""
+		row = self.conn.execute('SELECT value FROM Result WHERE key = ?', (json.dumps(key),)).fetchone()
+		if row == None:
+			self.misses += 1
+			return default
+		self.hits += 1
+		return json.loads(row[0])
+	
+	def put(self, key, value):
+		"""Store the value for a key."""
+		self.put_many([(key, value)])
+	
+	def put_many(self, items):
+		"""Store values for many keys at once, from (key, value) pairs."""
+		rows = [(json.dumps(key), json.dumps(value)) for key, value in items]
+		self.conn.executemany('INSERT OR REPLACE INTO Result VALUES (?, ?)', rows)
+		self.pending += len(rows)
+		if self.pending >= self.commit_every:
+			self.commit()
+	
+	def get_or_compute(self, key, compute):
+		"""The value stored for a key, computing and storing it if there is none."""
+		# A value of None is returned but not stored.
+		value = self.get(key)
+		if value == None:
+			value = compute()
+			if value != None:
+				self.put(key, value)
+		return value
+	
+	def clear(self):
+		"""Forget every stored result."""
+		self.conn.execute('DELETE FROM Result')
+		self.commit()
+	
+	def commit(self):
+		"""Write pending results to the file."""
+		self.conn.commit()
+		self.pending = 0
+	
+	def close(self):
+		"""Write pending results and close the file."""
+		self.commit()
+		self.conn.close()
+	
+	def __len__(self):
+		return self.conn.execute('SELECT COUNT(*) FROM Result').fetchone()[0]
+	
+	def __contains__(self, key):
+		row = self.conn.execute('SELECT 1 FROM Result WHERE key = ?', (json.dumps(key),)).fetchone()
+		return row != None
+
+
+def process_alive(pid):
+	"""Determine if a process on this machine is running."""
+	try:
+		os.kill(pid, 0)
+	except OSError as e:
+		return e.errno != errno.ESRCH
+	return True
+
 
+class SharedCache(object):
+	"""Results in an SQLite file shared by the threads and processes of one machine."""
+	# Works like PersistentCache, but every write is committed at once and
+	# get_or_compute is atomic: the first worker to miss a key claims it,
+	# and the others wait until its value is stored. A claim left by a
+	# process that died, or by a failed computation, is taken over.
+	
+	def __init__(self, path, poll=0.01, max_poll=0.5):
+		self.path = path
+		self.poll = poll
+		self.max_poll = max_poll
+		self.local = threading.local()
+		self.hits = 0
+		self.misses = 0
+		conn = self.conn
+		conn.execute('PRAGMA journal_mode=WAL')
+		conn.execute('CREATE TABLE IF NOT EXISTS SharedResult '
+		             '(key TEXT PRIMARY KEY, value TEXT, owner INTEGER)')
+	
+	@property
+	def conn(self):
+		"""This thread's connection to the file."""
+		# SQLite connections can't be shared between threads.
+		if not hasattr(self.local, 'conn'):
+			self.local.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+		return self.local.conn
+	
+	def get(self, key, default=None):
+		"""The value stored for a key, or default if there is none."""
+		row = self.conn.execute('SELECT value FROM SharedResult WHERE key = ? AND owner IS NULL',
+		                        (json.dumps(key),)).fetchone()
+		if row == None:
+			self.misses += 1
+			return default
+		self.hits += 1
+		return json.loads(row[0])
+	
+	def put(self, key, value):
+		"""Store the value for a key."""
+		self.put_many([(key, value)])
+	
+	def put_many(self, items):
+		"""Store values for many keys at once, from (key, value) pairs."""
+		rows = [(json.dumps(key), json.dumps(value)) for key, value in items]
+		conn = self.conn
+		conn.execute('BEGIN IMMEDIATE')
+		conn.executemany('INSERT OR REPLACE INTO SharedResult VALUES (?, ?, NULL)', rows)
+		conn.execute('COMMIT')
+	
+	def claim(self, key):
+		"""Claim a key for this process, or get its value; (claimed, value)."""
+		conn = self.conn
+		conn.execute('BEGIN IMMEDIATE')
+		try:
+			row = conn.execute('SELECT value, owner FROM SharedResult WHERE key = ?', (key,)).fetchone()
+			if row != None and row[1] == None:
+				return False, json.loads(row[0])
+			if row == None or not process_alive(row[1]):
+				conn.execute('INSERT OR REPLACE INTO SharedResult VALUES (?, NULL, ?)',
+				             (key, os.getpid()))
+				return True, None
+			return False, None
+		finally:
+			conn.execute('COMMIT')
+	
+	def get_or_compute(self, key, compute):
+		"""The value stored for a key, computing and storing it if there is none."""
+		# A value of None is returned but not stored.
+		key = json.dumps(key)
+		poll = self.poll
+		while True:
+			claimed, value = self.claim(key)
+			if claimed:
+				break
+			if value != None:
+				self.hits += 1
+				return value
+			time.sleep(poll)
+			poll = min(2 * poll, self.max_poll)
+		self.misses += 1
+		value = None
+		try:
+			value = compute()
+		finally:
+			if value == None:
+				self.conn.execute('DELETE FROM SharedResult WHERE key = ? AND owner = ?',
+				                  (key, os.getpid()))
+			else:
+				self.conn.execute('UPDATE SharedResult SET value = ?, owner = NULL WHERE key = ?',
+				                  (json.dumps(value), key))
+		return value
+	
+	def clear(self):
+		"""Forget every stored result."""
+		self.conn.execute('DELETE FROM SharedResult')
+	
+	def commit(self):
+		"""Does nothing; writes are committed as they're made."""
+		pass
+	
+	def close(self):
+		"""Close this thread's connection to the file."""
+		if hasattr(self.local, 'conn'):
+			self.local.conn.close()
+			del self.local.conn
+	
+	def __len__(self):
+		return self.conn.execute('SELECT COUNT(*) FROM SharedResult WHERE owner IS NULL').fetchone()[0]
+	
+	def __contains__(self, key):
+		row = self.conn.execute('SELECT 1 FROM SharedResult WHERE key = ? AND owner IS NULL',
+		                        (json.dumps(key),)).fetchone()
+		return row != None
@@ -11,7 +11,7 @@ The schema for the database.
 # now--SQLite3 will do just fine. Mainly using sqlalchemy for
 # flexible query generation.
 
-script = """
+wipe = """
 -- Wipe database
 DROP TABLE IF EXISTS Graph;
 DROP TABLE IF EXISTS Permutation;
@@ -20,7 +20,13 @@ DROP TABLE IF EXISTS PermGroup;
 DROP TABLE IF EXISTS GroupElement;
 DROP TABLE IF EXISTS Histogram;
 DROP TABLE IF EXISTS Trial;
+DROP TABLE IF EXISTS Estimate;
+DROP TABLE IF EXISTS EstimateHistogram;
+"""
 
+# Creating the tables and indexes doesn't touch those that exist already,
+# so it also brings databases made by earlier versions up to date.
+create = """
 CREATE TABLE IF NOT EXISTS Graph (
 	id INTEGER PRIMARY KEY, -- The graph encoded as an integer
 	nodes INTEGER,
@@ -30,7 +36,7 @@ CREATE TABLE IF NOT EXISTS Graph (
 
 CREATE TABLE IF NOT EXISTS Permutation (
 	id INTEGER PRIMARY KEY, -- The permutation encoded as an integer
-	cycle_decomp INTEGER -- The cycle decomposition count encoded as an integer
+	cycle_decomp INTEGER -- The cycle decomposition count encoded as an integer (see cycle_encoding)
 );
 
 /* Cycle decomposition histograms for groups, representation 1 */
@@ -45,11 +51,13 @@ CREATE UNIQUE INDEX IF NOT EXISTS GroupClassRepr ON GroupClass(repr);
 /* Groups of permutations, representation 1 */
 CREATE TABLE IF NOT EXISTS PermGroup (
 	id INTEGER PRIMARY KEY, -- Possibly arbitrary identifier
-	repr TEXT,              -- Unique JSON representation as a list of integers
+	repr BLOB,              -- Unique binary representation (serialize.encode_group),
+	                        -- or S<m> or A<m> for symmetric and alternating groups
+	digest BLOB,            -- 128-bit digest of repr (serialize.group_digest)
 	cls INTEGER REFERENCES GroupClass(id)
 );
 
-CREATE UNIQUE INDEX IF NOT EXISTS GroupRepr ON PermGroup(repr);
+CREATE UNIQUE INDEX IF NOT EXISTS UniqueGroup ON PermGroup(digest, repr);
 
 /* Groups of permutations, representation 2 */
 CREATE TABLE IF NOT EXISTS GroupElement (
@@ -63,7 +71,7 @@ CREATE INDEX IF NOT EXISTS ElementAccess ON GroupElement(elt);
 /* Cycle decomposition histograms for groups, representation 2 */
 CREATE TABLE IF NOT EXISTS Histogram (
 	id INTEGER REFERENCES GroupClass(id),
-	decomp INTEGER,         -- Sequence of integers encoded as an integer
+	decomp INTEGER,         -- Cycle decomposition count encoded as an integer (see cycle_encoding)
 	count INTEGER
 );
 
@@ -82,5 +90,31 @@ CREATE TABLE IF NOT EXISTS Trial (
 
 CREATE UNIQUE INDEX IF NOT EXISTS UniqueTrial ON Trial(graph, nodes, method, datetime);
 CREATE INDEX IF NOT EXISTS TrialTime ON Trial(datetime);
+
+/* Estimates of traversal groups too large to generate, from random elements */
+CREATE TABLE IF NOT EXISTS Estimate (
+	id INTEGER PRIMARY KEY, -- Arbitrary identifier
+	trial INTEGER REFERENCES Trial(id),
+	samples INTEGER,        -- Number of random group elements drawn
+	size REAL,              -- Estimated order of the group, NULL if no samples
+	                        -- repeated (then only size_low is known)
+	size_low REAL,
+	size_high REAL          -- NULL if unbounded
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS EstimateTrial ON Estimate(trial);
+
+/* Estimated cycle decomposition histograms, as shares of the group */
+CREATE TABLE IF NOT EXISTS EstimateHistogram (
+	id INTEGER REFERENCES Estimate(id),
+	decomp INTEGER,         -- Cycle decomposition count encoded as an integer (see cycle_encoding)
+	share REAL,
+	share_low REAL,
+	share_high REAL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS UniqueEstimateHistogram ON EstimateHistogram(id, decomp);
 """
-    
\ No newline at end of file
+
+
+script = wipe + create
@@ -6,12 +6,23 @@ Bijections and Permutations, with special associated features
 for Permutations.
 """
 
+import sys
+import math
+import random as r
 import itertools as it
 import collections as cl
+from math import factorial
+
+import numpy as np
 
 from cache import lru_cache
 
 
+# Random choices made by group algorithms; kept apart from the module-level
+# random state so that they don't disturb the choice of trials.
+sampler = r.Random()
+
+
 class Bijection(object):
 	"""A one-to-one correspondence between two sets of things."""
 	def __init__(self, f, inv=None):
@@ -143,8 +154,99 @@ class Permutation(Bijection):
 		return len(self)
 
 
+class CompactPermutation(object):
+	"""A permutation of {1, ..., n} stored as a tuple of images."""
+	# arr holds the images of 0, ..., n-1; rank is filled in by
+	# serialize.perm_to_int the first time the permutation is encoded.
+	__slots__ = ('arr', 'rank', '_hash', '_inv')
+	
+	def __init__(self, f):
+		self.arr = tuple(int(elt) - 1 for elt in f)
+		self.rank = None
+		self._hash = None
+		self._inv = None
+	
+	@classmethod
+	def from_images(cls, arr):
+		"""Make a permutation from a tuple of images of 0, ..., n-1."""
+		perm = cls.__new__(cls)
+		perm.arr = arr
+		perm.rank = None
+		perm._hash = None
+		perm._inv = None
+		return perm
+	
+	@property
+	def letters(self):
+		"""The letters the permutation acts on."""
+		return range(1, len(self.arr) + 1)
+	
+	@property
+	def inv(self):
+		"""The inverse permutation."""
+		if self._inv == None:
+			self._inv = CompactPermutation.from_images(invert(self.arr))
+			self._inv._inv = self
+		return self._inv
+	
+	def of(self, perm):
+		"""Compose the permutation with another."""
+		n = len(self.arr)
+		if type(perm) is CompactPermutation and len(perm.arr) == n:
+			return CompactPermutation.from_images(compose(self.arr, perm.arr))
+		n = max(n, degree_of([perm]))
+		return CompactPermutation.from_images(compose(images(self, n), images(perm, n)))
+	
+	def well_defined(self):
+		"""Ensure the permutation isn't broken."""
+		return sorted(self.arr) == range(len(self.arr))
+	
+	@property
+	def cycle_decomposition(self):
+		"""The cycle decomposition of the permutation."""
+		return CycleDecomposition(self)
+	
+	@property
+	def degree(self):
+		"""The degree of the permutation."""
+		return len(self.arr)
+	
+	def __getitem__(self, elt):
+		if 0 < elt <= len(self.arr):
+			return self.arr[elt - 1] + 1
+		return elt
+	
+	def __call__(self, elt):
+		return self[elt]
+	
+	def __len__(self):
+		return len(self.arr)
+	
+	def __iter__(self):
+		return (i + 1 for i in self.arr)
+	
+	def __eq__(self, obj):
+		if obj.__class__ != self.__class__:
+			return False
+		return self.arr == obj.arr
+	
+	def __ne__(self, obj):
+		return not (self == obj)
+	
+	def __hash__(self):
+		if self._hash == None:
+			self._hash = hash(self.arr)
+		return self._hash
+	
+	def __repr__(self):
+		repr = ', '.join("%r->%r" % (i + 1, j + 1) for i, j in enumerate(self.arr))
+		return "(%s)" % repr
+
+
 def cycle_decomposition(perm):
 	"""The cycle decomposition of a permutation."""
+	if type(perm) is CompactPermutation:
+		return compact_cycle_decomposition(perm.arr)
 	cycles = []
 	visited = set()
 	for lt in perm.letters:
@@ -160,6 +262,23 @@ def cycle_decomposition(perm):
 	return cycles
 
 
+def compact_cycle_decomposition(arr):
+	"""The cycle decomposition of a permutation given as a tuple of images."""
+	cycles = []
+	visited = [False] * len(arr)
+	for start in arr:
+		if not visited[start]:
+			cur_cycle = [start + 1]
+			visited[start] = True
+			cur_elt = arr[start]
+			while cur_elt != start:
+				cur_cycle.append(cur_elt + 1)
+				visited[cur_elt] = True
+				cur_elt = arr[cur_elt]
+			cycles.append(cur_cycle)
+	return cycles
+
+
 class CycleDecomposition(object):
 	"""The cycle decomposition of a permutation."""
 	def __init__(self, perm):
@@ -207,19 +326,27 @@ class CycleCount(object):
 		return repr(tuple(self))
 
 
+def multiply(p, q):
+	"""The composition of two permutations, as a permutation like p."""
+	pq = p.of(q)
+	if type(pq) is dict:
+		return Permutation(pq)
+	return pq
+
+
 def add_elements(elt, new, group):
 	"""Generate new permutations to add to a group."""
 	computed = set()
 	for n in new:
-		new_elt = Permutation(elt.of(n))
+		new_elt = multiply(elt, n)
 		if new_elt not in group:
 			computed.add(new_elt)
 			group.add(new_elt)
 	return computed
 
 
-def generate_group(gens):
-	"""The group generated by a collection of permutations."""
+def close_group(gens):
+	"""The group generated by a collection of permutations, by brute force."""
 	new, group = set(gens), set(gens)
 	while(len(new)) > 0:
 		computed = set()
@@ -229,20 +356,575 @@ def generate_group(gens):
 	return group
 
 
-@lru_cache
+# Permutations of {1, ..., n} are handled below as tuples of images of
+# {0, ..., n-1}, which are much cheaper to compose and hash than dicts.
+
+
+def images(perm, n):
+	"""The images of 0, ..., n-1 under a permutation of {1, ..., n}."""
+	if type(perm) is CompactPermutation and len(perm.arr) == n:
+		return perm.arr
+	return tuple(perm[lt] - 1 for lt in xrange(1, n + 1))
+
+
+def compose(p, q):
+	"""The composition p(q(x)) of two permutations given as tuples of images."""
+	return tuple(map(p.__getitem__, q))
+
+
+def invert(p):
+	"""The inverse of a permutation given as a tuple of images."""
+	inv = [0] * len(p)
+	for i, j in enumerate(p):
+		inv[j] = i
+	return tuple(inv)
+
+
+def degree_of(perms):
+	"""The least n such that the permutations act on {1, ..., n}."""
+	return max(max(perm.letters) if len(perm.letters) else 0 for perm in perms)
+
+
+def identity_like(perm):
+	"""The identity permutation of the same kind and degree as a permutation."""
+	n = degree_of([perm])
+	if type(perm) is CompactPermutation:
+		return CompactPermutation.from_images(tuple(xrange(n)))
+	return Permutation(range(1, n + 1))
+
+
+def support_degree(perms):
+	"""The largest letter moved by any of the permutations, 0 if none is moved."""
+	return max([0] + [lt for perm in perms for lt in perm.letters if perm[lt] != lt])
+
+
+class StabilizerChain(object):
+	"""A base and strong generating set for a permutation group."""
+	# https://en.wikipedia.org/wiki/Schreier%E2%80%93Sims_algorithm
+	
+	def __init__(self, gens, n=None):
+		gens = list(gens)
+		if n == None:
+			n = degree_of(gens) if gens else 0
+		self.n = n
+		self.identity = tuple(xrange(n))
+		self.base = []
+		# generators[i] generate the subgroup fixing base[:i]; transversals[i]
+		# maps each point in the orbit of base[i] to a coset representative
+		# that carries base[i] to the point.
+		self.generators = []
+		self.transversals = []
+		for gen in gens:
+			self.extend(images(gen, n))
+	
+	def sift(self, p, level=0):
+		"""Strip a permutation through the chain, starting at some level."""
+		for b, transversal in it.izip(self.base[level:], self.transversals[level:]):
+			u = transversal.get(p[b])
+			if u == None:
+				break
+			p = compose(invert(u), p)
+		return p
+	
+	def extend(self, p, level=0):
+		"""Add a permutation fixing base[:level] to the group at some level."""
+		if self.sift(p, level) == self.identity:
+			return
+		if level == len(self.base):
+			moved = next(i for i, j in enumerate(p) if i != j)
+			self.base.append(moved)
+			self.generators.append([])
+			self.transversals.append({moved: self.identity})
+		gens = self.generators[level]
+		transversal = self.transversals[level]
+		gens.append(p)
+		# Close the orbit of the base point under the new generator. By
+		# Schreier's lemma, the stabilizer of the base point is generated
+		# by the Schreier generators of the orbit, which are added below.
+		pending = [(beta, p) for beta in transversal]
+		while pending:
+			beta, s = pending.pop()
+			gamma = s[beta]
+			u = compose(s, transversal[beta])
+			if gamma not in transversal:
+				transversal[gamma] = u
+				pending.extend((gamma, t) for t in gens)
+			else:
+				self.extend(compose(invert(transversal[gamma]), u), level + 1)
+	
+	@property
+	def order(self):
+		"""The number of elements in the group."""
+		order = 1
+		for transversal in self.transversals:
+			order *= len(transversal)
+		return order
+	
+	def tuples(self, level=0):
+		"""Yield the elements of the group fixing base[:level] as tuples of images."""
+		if level == len(self.base):
+			yield self.identity
+			return
+		# Every element is a product of one coset representative per level.
+		tail = [self.identity]
+		for transversal in reversed(self.transversals[level + 1:]):
+			tail = [compose(u, p) for u in transversal.itervalues() for p in tail]
+		for u in self.transversals[level].itervalues():
+			for p in tail:
+				yield compose(u, p)
+	
+	def __len__(self):
+		return self.order
+	
+	def __contains__(self, perm):
+		if any(perm[lt] != lt for lt in perm.letters if lt > self.n):
+			return False
+		return self.sift(images(perm, self.n)) == self.identity
+	
+	def __iter__(self):
+		return (Permutation([i + 1 for i in p]) for p in self.tuples())
+
+
+def dimino_extend(elements, gens, gen):
+	"""Extend a group, given as a list of tuples of images, by a generator."""
+	# Dimino's algorithm: the group generated by H and gen is a union of
+	# cosets of H, so it grows a whole coset at a time. Returns the new
+	# elements and generators, or the old ones if gen is already a member.
+	# An empty list of elements stands for the trivial group.
+	identity = tuple(xrange(len(gen)))
+	if not elements:
+		elements = [identity]
+	known = set(elements)
+	if identity not in known:
+		raise ValueError("elements are not a group; the identity is missing")
+	if gen in known:
+		return elements, gens
+	subgroup = elements
+	elements = list(elements)
+	gens = gens + [gen]
+	reps = [identity]
+	for rep in reps:
+		for s in gens:
+			rs = compose(rep, s)
+			if rs not in known:
+				coset = [compose(h, rs) for h in subgroup]
+				elements.extend(coset)
+				known.update(coset)
+				reps.append(rs)
+	return elements, gens
+
+
+def extend_group(group, gens, gen):
+	"""The group generated by gens and gen, given the group gens generate."""
+	group, gens = list(group), list(gens)
+	n = degree_of(group + gens + [gen])
+	elements = [images(elt, n) for elt in group]
+	gen_images = [images(g, n) for g in gens]
+	elements, _ = dimino_extend(elements, gen_images, images(gen, n))
+	if type(gen) is CompactPermutation:
+		return set(it.imap(CompactPermutation.from_images, elements))
+	return {Permutation([i + 1 for i in p]) for p in elements}
+
+
+class OrderExceeds(object):
+	"""A stop predicate for iter_group: more than k elements have been found."""
+	def __init__(self, k):
+		self.k = k
+		self.triggered = False
+	
+	def __call__(self, elt, count):
+		self.triggered = self.triggered or count > self.k
+		return self.triggered
+
+
+class ContainsOdd(object):
+	"""A stop predicate for iter_group: an odd permutation has been found."""
+	def __init__(self):
+		self.triggered = False
+	
+	def __call__(self, elt, count):
+		n = degree_of([elt])
+		if not self.triggered:
+			self.triggered = sum(length - 1 for length in cycle_lengths(images(elt, n))) % 2 == 1
+		return self.triggered
+
+
+class MemoryExceeds(object):
+	"""A stop predicate for iter_group: the elements found take more than some bytes."""
+	def __init__(self, budget):
+		self.budget = budget
+		self.triggered = False
+	
+	def __call__(self, elt, count):
+		# An element is held as a tuple in a set; ints below 257 are shared.
+		n = degree_of([elt])
+		per_element = sys.getsizeof(tuple(xrange(n))) + 3 * sys.getsizeof(None)
+		self.triggered = self.triggered or count * per_element > self.budget
+		return self.triggered
+
+
+def iter_group(gens, stop=()):
+	"""Yield the elements of the group generated by permutations as they're found."""
+	# Stops early once any of the stop predicates, called with each new
+	# element and the number of elements found so far, returns True.
+	gens = list(gens)
+	if not gens:
+		return
+	n = degree_of(gens)
+	gen_images = [images(gen, n) for gen in gens]
+	if all(type(gen) is CompactPermutation for gen in gens):
+		make = CompactPermutation.from_images
+	else:
+		make = lambda p: Permutation([i + 1 for i in p])
+	# The identity is found again as a product, since the group is finite.
+	seen = set()
+	frontier = [tuple(xrange(n))]
+	while frontier:
+		new = []
+		for p in frontier:
+			for g in gen_images:
+				q = compose(g, p)
+				if q not in seen:
+					seen.add(q)
+					new.append(q)
+					elt = make(q)
+					yield elt
+					if any([s(elt, len(seen)) for s in stop]):
+						return
+		frontier = new
+
+
+def to_array(perms, n):
+	"""Stack permutations of {1, ..., n} as rows of images of 0, ..., n-1."""
+	return np.array([images(perm, n) for perm in perms], dtype=np.intp).reshape(-1, n)
+
+
+def row_keys(arr):
+	"""Distinct, sortable keys for the rows of an array of permutations."""
+	n = arr.shape[1]
+	if n > 15:
+		# Too long for 64-bit integer keys; the rows' bytes are the keys.
+		rows = np.ascontiguousarray(arr)
+		return rows.view(np.dtype((np.void, rows.dtype.itemsize * n))).ravel()
+	weights = np.int64(n) ** np.arange(n, dtype=np.int64)
+	return arr.astype(np.int64).dot(weights)
+
+
+def batch_closure(gens):
+	"""The group generated by the rows of an array of permutations."""
+	# Every generator is composed with the whole frontier at once by fancy
+	# indexing; new elements are found by looking their keys up in the
+	# sorted keys of the elements found so far.
+	keys, first = np.unique(row_keys(gens), return_index=True)
+	frontier = gens[first]
+	found = [frontier]
+	while len(frontier):
+		products = gens[:, frontier].reshape(-1, gens.shape[1])
+		product_keys, first = np.unique(row_keys(products), return_index=True)
+		pos = np.searchsorted(keys, product_keys).clip(0, len(keys) - 1)
+		new = keys[pos] != product_keys
+		frontier = products[first[new]]
+		found.append(frontier)
+		keys = np.union1d(keys, product_keys[new])
+	return np.concatenate(found)
+
+
+def generate_group(gens, mode='chain'):
+	"""The group generated by a collection of permutations."""
+	# mode is one of 'chain' (Schreier-Sims), 'dimino' (coset by coset),
+	# 'batch' (vectorized closure), or 'closure' (brute force).
+	gens = list(gens)
+	if not gens:
+		return set()
+	if mode == 'closure':
+		return close_group(gens)
+	if mode == 'chain':
+		tuples = StabilizerChain(gens).tuples()
+	elif mode == 'dimino':
+		n = degree_of(gens)
+		tuples, gen_images = [tuple(xrange(n))], []
+		for gen in gens:
+			tuples, gen_images = dimino_extend(tuples, gen_images, images(gen, n))
+	elif mode == 'batch':
+		tuples = it.imap(tuple, batch_closure(to_array(gens, degree_of(gens))).tolist())
+	else:
+		raise ValueError("unknown mode %r" % mode)
+	if all(type(gen) is CompactPermutation for gen in gens):
+		return set(it.imap(CompactPermutation.from_images, tuples))
+	return {Permutation([i + 1 for i in p]) for p in tuples}
+
+
+@lru_cache(maxsize=5040)
 def cyclic_group(elt):
 	"""The cyclic group generated by elt."""
 	group = {elt}
-	g = Permutation(elt.of(elt))
+	g = multiply(elt, elt)
 	while g not in group:
 		group.add(g)
-		g = Permutation(elt.of(g))
+		g = multiply(elt, g)
 	return group
 
 
+def cycle_types(arr):
+	"""Count the cycles of each length in every row of an array of permutations."""
+	# Column k of the result counts the cycles of length k. Each point is
+	# labeled with the least point in its cycle by pointer jumping: after
+	# t rounds, a label is the least of the next 2^t points in its cycle.
+	m, n = arr.shape
+	rows = np.arange(m)[:, np.newaxis]
+	label = np.tile(np.arange(n), (m, 1))
+	jump = arr
+	span = 1
+	while span < n:
+		label = np.minimum(label, label[rows, jump])
+		jump = jump[rows, jump]
+		span *= 2
+	sizes = np.bincount((rows * n + label).ravel(), minlength=m * n).reshape(m, n)
+	r, least = np.nonzero(sizes)
+	return np.bincount(r * (n + 1) + sizes[r, least], minlength=m * (n + 1)).reshape(m, n + 1)
+
+
+def cycle_type_key(row):
+	"""The cycle count of a row of cycle_types, as a tuple like CycleCount's."""
+	longest = np.nonzero(row)[0][-1]
+	return tuple(int(c) for c in row[2:longest + 1])
+
+
+def cycle_type_keys(perms):
+	"""The cycle counts of a list of permutations, as tuples like CycleCount's."""
+	if not perms:
+		return []
+	types = cycle_types(to_array(perms, degree_of(perms)))
+	unique, inverse = np.unique(types, axis=0, return_inverse=True)
+	keys = [cycle_type_key(row) for row in unique]
+	return [keys[i] for i in inverse]
+
+
 def get_fingerprint(group):
 	"""A histogram of cycle counts of permutations in a group."""
-	return cl.Counter(g.cycle_decomposition.count for g in group)
+	group = list(group)
+	if not group:
+		return cl.Counter()
+	types = cycle_types(to_array(group, degree_of(group)))
+	unique, counts = np.unique(types, axis=0, return_counts=True)
+	return cl.Counter({cycle_type_key(row): int(c) for row, c in it.izip(unique, counts)})
 
 
+def orbits(gens, n):
+	"""The orbits of {0, ..., n-1} under permutations given as tuples of images."""
+	seen = [False] * n
+	result = []
+	for start in xrange(n):
+		if not seen[start]:
+			seen[start] = True
+			orbit = [start]
+			for x in orbit:
+				for g in gens:
+					if not seen[g[x]]:
+						seen[g[x]] = True
+						orbit.append(g[x])
+			result.append(orbit)
+	return result
 
+
+def minimal_block(gens, n, b):
+	"""The size of the least block of imprimitivity containing 0 and b."""
+	# Atkinson's algorithm: merge 0 and b, then merge the images of
+	# every merged pair until the partition is invariant.
+	parent = range(n)
+	
+	def find(x):
+		while parent[x] != x:
+			parent[x] = parent[parent[x]]
+			x = parent[x]
+		return x
+	
+	parent[b] = 0
+	merged = [(0, b)]
+	while merged:
+		x, y = merged.pop()
+		for g in gens:
+			u, v = find(g[x]), find(g[y])
+			if u != v:
+				parent[v] = u
+				merged.append((u, v))
+	root = find(0)
+	return sum(1 for x in xrange(n) if find(x) == root)
+
+
+def is_primitive(gens, n):
+	"""Determine if permutations given as tuples of images generate a primitive group."""
+	if len(orbits(gens, n)) != 1:
+		return False
+	return all(minimal_block(gens, n, b) == n for b in xrange(1, n))
+
+
+def is_prime(k):
+	"""Determine if a positive integer is prime."""
+	return k > 1 and all(k % d for d in xrange(2, int(k ** 0.5) + 1))
+
+
+def cycle_lengths(p):
+	"""The lengths of the cycles of a permutation given as a tuple of images."""
+	return [len(cycle) for cycle in compact_cycle_decomposition(p)]
+
+
+def has_jordan_power(p):
+	"""Determine if a power of p is a transposition, a 3-cycle or a short prime cycle."""
+	# If p has exactly one cycle of prime length q and no other cycle length
+	# is divisible by q, raising p to the lcm of the other lengths leaves
+	# a single q-cycle. A primitive group on n points containing a q-cycle
+	# contains the alternating group if q <= 3 or q <= n - 3 (Jordan).
+	lengths = cycle_lengths(p)
+	n = len(p)
+	for q in set(lengths):
+		if is_prime(q) and (q <= 3 or q <= n - 3) and lengths.count(q) == 1:
+			if all(length % q for length in lengths if length != q):
+				return True
+	return False
+
+
+def symmetric_or_alternating(gens, n=None, tries=30):
+	"""'S' or 'A' if gens are known to generate S_n or A_n, None if unknown."""
+	gens = list(gens)
+	if not gens:
+		return None
+	if n == None:
+		n = degree_of(gens)
+	gens = [images(gen, n) for gen in gens]
+	if not is_primitive(gens, n):
+		return None
+	# Look for a witness among the generators and along a random walk
+	witness = any(has_jordan_power(g) for g in gens)
+	p = tuple(xrange(n))
+	for _ in xrange(tries):
+		if witness:
+			break
+		p = compose(p, sampler.choice(gens))
+		witness = has_jordan_power(p)
+	if not witness:
+		return None
+	odd = any(sum(length - 1 for length in cycle_lengths(g)) % 2 for g in gens)
+	return 'S' if odd else 'A'
+
+
+def partitions(n, largest=None):
+	"""Yield the partitions of n as nonincreasing lists of parts."""
+	if largest == None:
+		largest = n
+	if n == 0:
+		yield []
+		return
+	for k in xrange(min(n, largest), 0, -1):
+		for rest in partitions(n - k, k):
+			yield [k] + rest
+
+
+def symmetric_fingerprint(n, alternating=False):
+	"""The histogram get_fingerprint gives for S_n or A_n, without enumerating it."""
+	fingerprint = cl.Counter()
+	for parts in partitions(n):
+		if alternating and (n - len(parts)) % 2:
+			continue
+		multiplicities = cl.Counter(parts)
+		centralizer = 1
+		for k, m in multiplicities.iteritems():
+			centralizer *= k ** m * factorial(m)
+		key = tuple(multiplicities[k] for k in xrange(2, parts[0] + 1))
+		fingerprint[key] = factorial(n) / centralizer
+	return fingerprint
+
+
+class ProductReplacement(object):
+	"""Random elements of a group by the product replacement algorithm."""
+	# https://en.wikipedia.org/wiki/Product_replacement_algorithm
+	# Uses the "rattle" variant, which also keeps an accumulator, since
+	# its output is closer to uniform on small generating sets.
+	
+	def __init__(self, gens, n=None, slots=10, scramble=50):
+		gens = list(gens)
+		if n == None:
+			n = degree_of(gens)
+		gens = [images(gen, n) for gen in gens] or [tuple(xrange(n))]
+		self.state = [gens[i % len(gens)] for i in xrange(max(slots, len(gens)))]
+		self.accumulator = tuple(xrange(n))
+		for _ in xrange(scramble):
+			self.next()
+	
+	def next(self):
+		"""The next random element as a tuple of images."""
+		i, j = sampler.sample(xrange(len(self.state)), 2)
+		s = self.state[j]
+		if sampler.random() < 0.5:
+			s = invert(s)
+		if sampler.random() < 0.5:
+			self.state[i] = compose(self.state[i], s)
+		else:
+			self.state[i] = compose(s, self.state[i])
+		self.accumulator = compose(self.accumulator, self.state[i])
+		return self.accumulator
+	
+	def __iter__(self):
+		return self
+	
+	__next__ = next
+
+
+def normal_quantile(confidence):
+	"""The z such that a standard normal variable is within z of 0 with some probability."""
+	low, high = 0.0, 40.0
+	for _ in xrange(100):
+		z = (low + high) / 2
+		if math.erf(z / math.sqrt(2)) < confidence:
+			low = z
+		else:
+			high = z
+	return z
+
+
+def wilson_interval(successes, trials, z):
+	"""A confidence interval for a proportion."""
+	p = float(successes) / trials
+	denominator = 1 + z * z / trials
+	center = (p + z * z / (2 * trials)) / denominator
+	half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+	return max(center - half, 0.0), min(center + half, 1.0)
+
+
+Estimate = cl.namedtuple('Estimate', ['order', 'low', 'high', 'samples', 'fingerprint'])
+
+
+def estimate_group(gens, n=None, samples=1000, confidence=0.95, stride=10):
+	"""Estimate a group's order and fingerprint from random elements."""
+	# The order is estimated from the number of pairs of equal samples,
+	# whose expected value is (samples choose 2) / order for independent
+	# uniform samples. Consecutive product replacement outputs are
+	# correlated, which adds collisions and pulls the order down, so only
+	# every stride-th output is taken as a sample. Some bias remains for
+	# small strides. The fingerprint
+	# maps each cycle count to its estimated share of the group, with
+	# lower and upper bounds. An upper bound of None means unbounded. With
+	# no repeated samples there's no estimate of the order, only the lower
+	# bound, so the order is None.
+	z = normal_quantile(confidence)
+	stride = max(stride, 1)
+	draws = it.islice(ProductReplacement(gens, n=n), stride - 1, stride * samples, stride)
+	elements = cl.Counter(draws)
+	pairs = samples * (samples - 1) / 2.0
+	collisions = sum(c * (c - 1) / 2 for c in elements.itervalues())
+	# A variance-stabilized interval for the Poisson number of collisions
+	few = (math.sqrt(collisions) - z / 2) ** 2 if math.sqrt(collisions) > z / 2 else 0.0
+	many = (math.sqrt(collisions + 1) + z / 2) ** 2
+	low = max(pairs / many, len(elements))
+	high = max(pairs / few, low) if few else None
+	order = max(pairs / collisions, low) if collisions else None
+	
+	distinct = list(elements)
+	counts = cl.Counter()
+	for p, row in it.izip(distinct, cycle_types(np.array(distinct, dtype=np.intp))):
+		counts[cycle_type_key(row)] += elements[p]
+	fingerprint = {}
+	for key, c in counts.iteritems():
+		share_low, share_high = wilson_interval(c, samples, z)
+		fingerprint[key] = (float(c) / samples, share_low, share_high)
+	return Estimate(order, low, high, samples, fingerprint)
@@ -8,6 +8,7 @@ A graph data structure.
 import math
 import random as r
 import itertools as it
+import multiprocessing as mp
 
 import numpy as np
 
@@ -24,6 +25,58 @@ except ImportError:
 	comb = substitute_comb
 
 
+class DisjointSet(object):
+	"""A union-find structure over hashable elements."""
+	
+	def __init__(self, elements=()):
+		self.parent = {}
+		self.size = {}
+		self.count = 0
+		for elt in elements:
+			self.add(elt)
+	
+	def __len__(self):
+		return len(self.parent)
+	
+	def __contains__(self, elt):
+		return elt in self.parent
+	
+	def add(self, elt):
+		"""Add an element in a set of its own."""
+		if elt not in self.parent:
+			self.parent[elt] = elt
+			self.size[elt] = 1
+			self.count += 1
+	
+	def find(self, elt):
+		"""The representative of the set containing an element."""
+		parent = self.parent
+		while parent[elt] != elt:
+			# Path halving
+			parent[elt] = parent[parent[elt]]
+			elt = parent[elt]
+		return elt
+	
+	def union(self, elt1, elt2):
+		"""Merge the sets containing two elements."""
+		root1, root2 = self.find(elt1), self.find(elt2)
+		if root1 == root2:
+			return root1
+		if self.size[root1] < self.size[root2]:
+			root1, root2 = root2, root1
+		self.parent[root2] = root1
+		self.size[root1] += self.size.pop(root2)
+		self.count -= 1
+		return root1
+	
+	def sets(self):
+		"""The sets, as a dictionary from representatives to sets of elements."""
+		sets = {}
+		for elt in self.parent:
+			sets.setdefault(self.find(elt), set()).add(elt)
+		return sets
+
+
 class Graph(object):
 	"""A graph data structure."""
 	def __init__(self, undirected=True):
@@ -31,6 +84,10 @@ class Graph(object):
 		self.edges = {}
 		self.neighbors = {}
 		self.undirected = undirected
+		# Connected components, kept up to date as nodes and edges are
+		# added. Deletions can split components, so they throw the
+		# structure away and it's rebuilt the next time it's needed.
+		self.components = DisjointSet()
 	
 	def __len__(self):
 		"""The number of nodes in the graph."""
@@ -59,6 +116,8 @@ class Graph(object):
 		if node not in self.nodes:
 			self.nodes[node] = val
 			self.neighbors[node] = set()
+			if self.components != None:
+				self.components.add(node)
 	
 	def add_nodes(self, nodes):
 		"""Add nodes to the graph."""
@@ -72,6 +131,7 @@ class Graph(object):
 				self.del_edge(node, self.neighbors[node].pop())
 			del self.nodes[node]
 			del self.neighbors[node]
+			self.components = None
 	
 	def del_nodes(self, nodes):
 		"""Delete nodes from the graph."""
@@ -92,6 +152,8 @@ class Graph(object):
 		self.neighbors[n1].add(n2)
 		if self.undirected:
 			self.neighbors[n2].add(n1)
+		if self.components != None:
+			self.components.union(n1, n2)
 	
 	def add_edges(self, edges):
 		"""Add edges to the graph."""
@@ -104,6 +166,7 @@ class Graph(object):
 			self.neighbors[n2].discard(n1)
 		self.neighbors[n1].discard(n2)
 		del self.edges[self.edge(n1, n2)]
+		self.components = None
 	
 	def del_edges(self, edges):
 		"""Delete edges from the graph."""
@@ -165,14 +228,35 @@ class Graph(object):
 		except StopIteration:
 			pass
 	
-	def connected_components(self, connect_method=bfs):
+	def disjoint_set(self):
+		"""The graph's connected components as a DisjointSet."""
+		if self.components == None:
+			self.components = DisjointSet(self.nodes)
+			for edge in self.edges:
+				self.components.union(*edge)
+		return self.components
+	
+	def is_connected(self):
+		"""See if the graph is connected."""
+		# For directed graphs, this means weakly connected.
+		return self.disjoint_set().count <= 1
+	
+	def component_of(self, node):
+		"""A representative node of the connected component containing a node."""
+		return self.disjoint_set().find(node)
+	
+	def connected_components(self):
 		""""Get the connected components of the graph."""
-		# This returns something slightly different for directed graphs.
-		nodes = list(self.nodes)
-		while len(nodes) > 0:
-			cur_component = set(connect_method(self, nodes.pop()))
-			yield cur_component
-			nodes -= cur_component
+		# For directed graphs, these are the weakly connected components.
+		return self.disjoint_set().sets().itervalues()
+	
+	def freeze(self):
+		"""A compact, read-only view of the graph for fast traversal."""
+		return CompactGraph(self)
+	
+	def traversal_matrix(self, algorithm='bfs', starts=None, processes=None):
+		"""The graph's traversals from each starting node, one per row."""
+		return self.freeze().traversal_matrix(algorithm, starts=starts, processes=processes)
 	
 	def to_networkx(self):
 		"""Convert the graph to a networkx graph."""
@@ -187,6 +271,292 @@ class Graph(object):
 		return graph
 
 
+class CompactGraph(object):
+	"""A frozen graph whose sorted neighbor lists are stored in flat arrays."""
+	# Nodes are numbered 0, ..., n-1 in sorted order. The neighbors of
+	# node i are neighbors[offsets[i]:offsets[i + 1]], in sorted order.
+	# Traversals return arrays of (integer) node labels.
+	
+	def __init__(self, graph):
+		self.labels = np.array(sorted(graph.nodes))
+		self.index = {node: i for i, node in enumerate(self.labels.tolist())}
+		offsets, neighbors = [0], []
+		for node in self.labels.tolist():
+			neighbors.extend(sorted(self.index[adj] for adj in graph.neighbors[node]))
+			offsets.append(len(neighbors))
+		self.offsets = np.array(offsets, dtype=np.intp)
+		self.neighbors = np.array(neighbors, dtype=np.intp)
+		# Scratch space shared by traversals. A node has been visited in
+		# the current traversal if its mark equals the current stamp.
+		# Traversals step through neighbor lists one node at a time, which
+		# is faster on plain lists and allocates nothing per node.
+		n = len(self.labels)
+		self.stamp = 0
+		self.offset_list = offsets
+		self.neighbor_list = neighbors
+		self.mark_list = [0] * n
+		self.queue = [0] * n
+		self.next_edge = [0] * n
+	
+	def __len__(self):
+		return len(self.labels)
+	
+	def bfs(self, start):
+		"""The nodes in breadth-first search from the starting node."""
+		offsets, neighbors, marks = self.offset_list, self.neighbor_list, self.mark_list
+		queue = self.queue
+		self.stamp += 1
+		stamp = self.stamp
+		node = self.index[start]
+		marks[node] = stamp
+		queue[0] = node
+		head, tail = 0, 1
+		while head < tail:
+			node = queue[head]
+			head += 1
+			for k in xrange(offsets[node], offsets[node + 1]):
+				adj = neighbors[k]
+				if marks[adj] != stamp:
+					marks[adj] = stamp
+					queue[tail] = adj
+					tail += 1
+		return self.labels[queue[:tail]]
+	
+	def dfs(self, start):
+		"""The nodes in depth-first search from the starting node."""
+		offsets, neighbors, marks = self.offset_list, self.neighbor_list, self.mark_list
+		next_edge = self.next_edge
+		self.stamp += 1
+		stamp = self.stamp
+		node = self.index[start]
+		marks[node] = stamp
+		next_edge[node] = offsets[node]
+		order = [node]
+		stack = [node]
+		while stack:
+			node = stack[-1]
+			k, end = next_edge[node], offsets[node + 1]
+			while k < end and marks[neighbors[k]] == stamp:
+				k += 1
+			if k == end:
+				stack.pop()
+				continue
+			next_edge[node] = k + 1
+			adj = neighbors[k]
+			marks[adj] = stamp
+			next_edge[adj] = offsets[adj]
+			order.append(adj)
+			stack.append(adj)
+		return self.labels[order]
+	
+	def traversal_matrix(self, algorithm='bfs', starts=None, processes=None):
+		"""The graph's traversals from each starting node, one per row."""
+		# algorithm is 'bfs' or 'dfs', and starts defaults to every node in
+		# sorted order. Rows are split among worker processes if asked.
+		if starts == None:
+			starts = self.labels.tolist()
+		return traversal_matrix(self, algorithm, list(starts), processes, self.labels.dtype)
+
+
+class BitGraph(object):
+	"""An undirected graph on nodes {1, ..., n} stored as adjacency bitmasks."""
+	# Bit i - 1 of adj[j - 1] is set if nodes i and j are adjacent. Bit
+	# C(k - 1, 2) + i - 1 of the graph_to_int encoding stands for the edge
+	# (i, k), i < k, so node k's edges to smaller nodes form one contiguous
+	# run of k - 1 bits: adj[k - 1] below bit k - 1.
+	__slots__ = ('n', 'adj')
+	
+	def __init__(self, n, adj=None):
+		self.n = n
+		self.adj = list(adj) if adj != None else [0] * n
+	
+	@classmethod
+	def from_int(cls, code, n=1):
+		"""Decode a graph_to_int encoding as a bit graph."""
+		while 1 << (n * (n - 1) / 2) <= code:
+			n += 1
+		graph = cls(n)
+		adj = graph.adj
+		for k in xrange(2, n + 1):
+			low = (code >> ((k - 1) * (k - 2) / 2)) & ((1 << (k - 1)) - 1)
+			adj[k - 1] = low
+			bit = 1 << (k - 1)
+			while low:
+				i = (low & -low).bit_length() - 1
+				adj[i] |= bit
+				low &= low - 1
+		return graph
+	
+	@classmethod
+	def from_graph(cls, graph):
+		"""A bit graph with the edges of a graph on nodes {1, ..., n}."""
+		bitgraph = cls(len(graph.nodes))
+		bitgraph.add_edges(graph.edges)
+		return bitgraph
+	
+	def to_int(self):
+		"""The graph_to_int encoding of the graph."""
+		code = 0
+		for k in xrange(2, self.n + 1):
+			code |= (self.adj[k - 1] & ((1 << (k - 1)) - 1)) << ((k - 1) * (k - 2) / 2)
+		return code
+	
+	def to_graph(self):
+		"""The graph as a Graph."""
+		graph = Graph()
+		graph.add_nodes(self.nodes)
+		graph.add_edges(self.edges)
+		return graph
+	
+	def __len__(self):
+		return self.n
+	
+	def __eq__(self, obj):
+		if self.__class__ != obj.__class__:
+			return False
+		return self.n == obj.n and self.adj == obj.adj
+	
+	def __hash__(self):
+		return hash((self.n, tuple(self.adj)))
+	
+	def __repr__(self):
+		return '(%s)' % ', '.join('%r<->%r' % edge for edge in self.edges)
+	
+	@property
+	def nodes(self):
+		"""The nodes 1, ..., n."""
+		return range(1, self.n + 1)
+	
+	@property
+	def edges(self):
+		"""The edges (i, k), i < k, in graph_to_int order."""
+		edges = []
+		for k in xrange(2, self.n + 1):
+			edges.extend((i, k) for i in bits(self.adj[k - 1] & ((1 << (k - 1)) - 1)))
+		return edges
+	
+	def add_edge(self, n1, n2):
+		"""Add an edge between two nodes."""
+		self.adj[n1 - 1] |= 1 << (n2 - 1)
+		self.adj[n2 - 1] |= 1 << (n1 - 1)
+	
+	def add_edges(self, edges):
+		"""Add edges to the graph."""
+		for edge in edges:
+			self.add_edge(*edge)
+	
+	def del_edge(self, n1, n2):
+		"""Delete an edge between two nodes."""
+		self.adj[n1 - 1] &= ~(1 << (n2 - 1))
+		self.adj[n2 - 1] &= ~(1 << (n1 - 1))
+	
+	def adjacent(self, n1, n2):
+		"""See if there's an edge between two nodes."""
+		return self.adj[n1 - 1] >> (n2 - 1) & 1 == 1
+	
+	def neighbors(self, node):
+		"""A node's neighbors in sorted order."""
+		return bits(self.adj[node - 1])
+	
+	def degree(self, node):
+		"""The number of a node's neighbors."""
+		return bin(self.adj[node - 1]).count('1')
+	
+	def component(self, node):
+		"""The bitmask of nodes in the same connected component as node."""
+		adj = self.adj
+		reached = frontier = 1 << (node - 1)
+		while frontier:
+			spread = 0
+			while frontier:
+				low = frontier & -frontier
+				spread |= adj[low.bit_length() - 1]
+				frontier ^= low
+			frontier = spread & ~reached
+			reached |= frontier
+		return reached
+	
+	def is_connected(self):
+		"""See if the graph is connected."""
+		return self.n == 0 or self.component(1) == (1 << self.n) - 1
+	
+	def bfs(self, start):
+		"""The nodes in breadth-first search from the starting node."""
+		adj = self.adj
+		visited = 1 << (start - 1)
+		order = [start]
+		for node in order:
+			new = adj[node - 1] & ~visited
+			visited |= new
+			while new:
+				low = new & -new
+				order.append(low.bit_length())
+				new ^= low
+		return order
+	
+	def dfs(self, start):
+		"""The nodes in depth-first search from the starting node."""
+		adj = self.adj
+		visited = 1 << (start - 1)
+		order = [start]
+		stack = [start]
+		while stack:
+			new = adj[stack[-1] - 1] & ~visited
+			if not new:
+				stack.pop()
+				continue
+			low = new & -new
+			visited |= low
+			node = low.bit_length()
+			order.append(node)
+			stack.append(node)
+		return order
+	
+	def traversal_matrix(self, algorithm='bfs', starts=None, processes=None):
+		"""The graph's traversals from each starting node, one per row."""
+		if starts == None:
+			starts = self.nodes
+		return traversal_matrix(self, algorithm, list(starts), processes, np.intp)
+
+
+def bits(mask):
+	"""The (1-based) positions of the set bits of a mask, in increasing order."""
+	positions = []
+	while mask:
+		low = mask & -mask
+		positions.append(low.bit_length())
+		mask ^= low
+	return positions
+
+
+def traversal_matrix(graph, algorithm, starts, processes=None, dtype=np.intp):
+	"""A graph's traversals from some starting nodes, one per row."""
+	if processes > 1 and len(starts) > 1:
+		chunks = [chunk.tolist() for chunk in np.array_split(starts, processes) if len(chunk)]
+		pool = mp.Pool(processes)
+		try:
+			parts = pool.map(traversal_rows, [(graph, algorithm, chunk) for chunk in chunks])
+		finally:
+			pool.close()
+			pool.join()
+		return np.vstack(parts)
+	traverse = getattr(graph, algorithm)
+	n = len(graph)
+	matrix = np.empty((len(starts), n), dtype=dtype)
+	for i, start in enumerate(starts):
+		row = traverse(start)
+		if len(row) != n:
+			raise ValueError("graph is not connected")
+		matrix[i] = row
+	return matrix
+
+
+def traversal_rows(args):
+	"""Rows of a traversal matrix, computed in a worker process."""
+	graph, algorithm, starts = args
+	return graph.traversal_matrix(algorithm, starts=starts)
+
+
 def neighbor_adder(graph, visited):
 	"""Get a function that adds unexplored nodes to the fringe in graph traversal."""
 	def add_neighbors_of(node):
@@ -218,6 +588,55 @@ def complete_graph_edges(n):
 			yield i, k
 			
 
+def connected_graph_codes(n):
+	"""The graph_to_int encodings of the connected graphs on nodes {1, ..., n}."""
+	# Walks all 2^C(n, 2) codes in Gray code order, so each step adds or
+	# removes one edge. Adding an edge to a connected graph, or removing
+	# one from a disconnected graph, can't change whether it's connected,
+	# and a graph with fewer than n - 1 edges is never connected. Only the
+	# other steps need a search, which stops once it has an answer.
+	if n <= 1:
+		yield 0
+		return
+	edges = [(i - 1, k - 1) for i, k in complete_graph_edges(n)]
+	adj = [0] * n
+	full = (1 << n) - 1
+	code, num_edges, connected = 0, 0, False
+	for step in xrange(1, 1 << len(edges)):
+		low = step & -step
+		code ^= low
+		i, k = edges[low.bit_length() - 1]
+		bit_i, bit_k = 1 << i, 1 << k
+		if code & low:
+			adj[i] |= bit_k
+			adj[k] |= bit_i
+			num_edges += 1
+			# Connected now if everything can be reached from node i
+			search = not connected and num_edges >= n - 1
+			target = full
+		else:
+			adj[i] ^= bit_k
+			adj[k] ^= bit_i
+			num_edges -= 1
+			connected = connected and num_edges >= n - 1
+			# Still connected if node k can be reached from node i
+			search = connected
+			target = bit_k
+		if search:
+			reached = frontier = bit_i
+			while frontier and reached & target != target:
+				spread = 0
+				while frontier:
+					node = frontier & -frontier
+					spread |= adj[node.bit_length() - 1]
+					frontier ^= node
+				frontier = spread & ~reached
+				reached |= frontier
+			connected = reached & target == target
+		if connected:
+			yield code
+
+
 def erdos_renyi(n, p):
 	"""An Erdos-Renyi random graph of the form G(n, p)."""
 	graph = Graph()
@@ -230,16 +649,97 @@ def erdos_renyi(n, p):
 
 def clique_max(graph):
 	"""The maximum size of a clique in the graph."""
-	n = len(graph)
-	for k in xrange(n, 0, -1):
-		for nodes in it.combinations(graph.nodes, k):
-			complete = True
-			for n1, n2 in it.combinations(nodes, 2):
-				if not graph.adjacent(n1, n2):
-					complete = False
-					break
-			if complete:
-				return k
+	if type(graph) is BitGraph:
+		return max_clique(graph.adj)
+	index = {node: i for i, node in enumerate(sorted(graph.nodes))}
+	adj = [0] * len(index)
+	for node, neighbors in graph.neighbors.iteritems():
+		for adj_node in neighbors:
+			adj[index[node]] |= 1 << index[adj_node]
+	return max_clique(adj)
+
+
+def popcount(mask):
+	"""The number of set bits in a mask."""
+	return bin(mask).count('1')
+
+
+def coloring_bound(adj, candidates):
+	"""The number of colors a greedy coloring of some nodes uses."""
+	# Each color class is an independent set, so a clique among the
+	# candidates has at most one node of each color.
+	colors = 0
+	uncolored = candidates
+	while uncolored:
+		colors += 1
+		available = uncolored
+		while available:
+			low = available & -available
+			uncolored ^= low
+			available &= ~low & ~adj[low.bit_length() - 1]
+	return colors
+
+
+def max_clique(adj):
+	"""The size of a largest clique in a graph given by adjacency bitmasks."""
+	# Bron-Kerbosch with pivoting, pruned by coloring bounds. Only the
+	# size of the growing clique is kept, not the clique itself.
+	best = [0]
+	
+	def expand(size, candidates):
+		if not candidates:
+			best[0] = max(best[0], size)
+			return
+		if size + coloring_bound(adj, candidates) <= best[0]:
+			return
+		# Every maximal clique contains the pivot or one of its non-neighbors.
+		pivot = max(bits(candidates), key=lambda node: popcount(candidates & adj[node - 1]))
+		branch = candidates & ~adj[pivot - 1]
+		while branch:
+			low = branch & -branch
+			expand(size + 1, candidates & adj[low.bit_length() - 1])
+			candidates ^= low
+			branch ^= low
+			if size + popcount(candidates) <= best[0]:
+				return
+	
+	expand(0, (1 << len(adj)) - 1)
+	return best[0]
+
+
+def clique_numbers(graphs):
+	"""The clique numbers of graphs given as (graph_to_int encoding, nodes) pairs."""
+	return [max_clique(BitGraph.from_int(code, n).adj) for code, n in graphs]
+
+
+def component_labels(codes, n):
+	"""Label the connected components of many graphs on nodes {1, ..., n}."""
+	# codes are graph_to_int encodings. Row i of the result gives each
+	# node of graph i the least node in its component, so graph i is
+	# connected when its row is all 1's.
+	m = len(codes)
+	if n == 0:
+		return np.zeros((m, 0), dtype=np.intp)
+	lower = np.zeros((m, n), dtype=np.int64)
+	for k in xrange(2, n + 1):
+		offset, column = (k - 1) * (k - 2) / 2, (1 << (k - 1)) - 1
+		lower[:, k - 1] = [(code >> offset) & column for code in codes]
+	adjacent = (lower[:, :, np.newaxis] >> np.arange(n)) & 1 == 1
+	adjacent |= adjacent.transpose(0, 2, 1)
+	labels = np.tile(np.arange(n), (m, 1))
+	rows = np.arange(m)[:, np.newaxis]
+	while True:
+		# Take the least label among each node's neighbors, then jump
+		# labels to their labels' labels until they settle.
+		spread = np.where(adjacent, labels[:, np.newaxis, :], n).min(axis=2)
+		new_labels = np.minimum(labels, spread)
+		jumped = new_labels[rows, new_labels]
+		while (jumped != new_labels).any():
+			new_labels = jumped
+			jumped = new_labels[rows, new_labels]
+		if (new_labels == labels).all():
+			return labels + 1
+		labels = new_labels
 
 
 def encoding_bound(n):
@@ -61,13 +61,13 @@ def cell_printer(pixels, cell_length):
     return print_cell
 
 
-def graph_printer(algorithm, cell_length, show=''):
+def graph_printer(algorithm, cell_length, show='', processes=None):
     """A function that prints a picture of a graph's traversal sequences."""
 
     def print_graph(graph, start_color, act_color, filename=''):
         """Print a picture of a graph's traversal sequences."""
         
-        traverse = getattr(graph, algorithm)
+        matrix = graph.traversal_matrix(algorithm, processes=processes)
         
         # Make color-assigning function
         nodes = sorted(graph.nodes)
@@ -82,8 +82,8 @@ def graph_printer(algorithm, cell_length, show=''):
         print_cell = cell_printer(pixels, cell_length)
         
         # Fill in image
-        for ycell, start_node in enumerate(nodes):
-            for xcell, node in enumerate(traverse(start_node)):
+        for ycell, row in enumerate(matrix.tolist()):
+            for xcell, node in enumerate(row):
                 print_cell(color(node), xcell, ycell) 
         if show:
             img.show()
@@ -117,13 +117,13 @@ def make_color(color_vals):
 
 def main(directory, algorithm, file_type='png',
          num_imgs=1, num_nodes=10, cell_length=10,
-         start_color=[0, 0, 0], act_color=[25, 25, 25]):
+         start_color=[0, 0, 0], act_color=[25, 25, 25], processes=None):
     """Print a picture of a graph's traversal permutations."""
     
     start_color, act_color = [make_color(c) for c in (start_color, act_color)]
     nodes = range(1, num_nodes + 1)
     make_filename = filename_maker(directory, file_type)
-    print_graph = graph_printer(algorithm, cell_length)
+    print_graph = graph_printer(algorithm, cell_length, processes=processes)
     
     for i in xrange(num_imgs):
         G = randobj.random_connected_graph(nodes)
@@ -0,0 +1,143 @@
+"""
+Author: Matt Christie, 2016
+
+Rank-indexed multiplication tables for small symmetric groups.
+Permutations are referred to by their serialize.perm_to_int ranks,
+so groups can be generated and classified with table lookups alone.
+"""
+
+import os
+import json
+import collections as cl
+
+import numpy as np
+
+import serialize as srz
+import functions as fctn
+from cache import memoized
+
+
+# S_7 has 5040 elements, so its multiplication table takes about 50 MB.
+# S_8's would take over 3 GB.
+max_n = 7
+
+
+def table_paths(n, directory):
+	"""The files holding the tables for the symmetric group on n letters."""
+	names = ['perms', 'mult', 'inv', 'classes']
+	paths = {name: os.path.join(directory, 'S%s.%s.npy' % (n, name)) for name in names}
+	paths['keys'] = os.path.join(directory, 'S%s.keys.json' % n)
+	return paths
+
+
+def save(path, write):
+	"""Write a file under a temporary name, then move it into place."""
+	# Other processes may be loading the same tables.
+	tmp = '%s.%s.tmp' % (path, os.getpid())
+	with open(tmp, 'wb') as file_out:
+		write(file_out)
+	os.rename(tmp, path)
+
+
+def build_tables(n, directory):
+	"""Compute the tables for the symmetric group on n letters and save them."""
+	if n > max_n:
+		raise ValueError("S_%s is too large to tabulate" % n)
+	if not os.path.exists(directory):
+		os.makedirs(directory)
+	size = srz.factorial(n)
+	dtype = np.uint16
+
+	# Row i holds the images of 0, ..., n-1 under the permutation of rank i
+	perms = srz.ints_to_perms(np.arange(size), n)
+	keys = fctn.row_keys(perms)
+	order = np.argsort(keys)
+	sorted_keys = keys[order]
+
+	def ranks_of(rows):
+		return order[np.searchsorted(sorted_keys, fctn.row_keys(rows))]
+
+	# mult[a, b] is the rank of the composition of a and b, a(b(x))
+	mult = np.empty((size, size), dtype=dtype)
+	for a in xrange(size):
+		mult[a] = ranks_of(perms[a][perms])
+	inv = np.empty(size, dtype=dtype)
+	a, b = np.nonzero(mult == 0)
+	inv[a] = b
+
+	# classes[a] indexes the cycle count of a's cycle decomposition in keys
+	cycle_counts = []
+	for row in perms.tolist():
+		perm = fctn.CompactPermutation.from_images(tuple(row))
+		cycle_counts.append(tuple(perm.cycle_decomposition.count))
+	class_keys = sorted(set(cycle_counts))
+	index = {key: i for i, key in enumerate(class_keys)}
+	classes = np.array([index[key] for key in cycle_counts], dtype=np.uint8)
+
+	paths = table_paths(n, directory)
+	save(paths['perms'], lambda f: np.save(f, perms.astype(np.uint8)))
+	save(paths['mult'], lambda f: np.save(f, mult))
+	save(paths['inv'], lambda f: np.save(f, inv))
+	save(paths['classes'], lambda f: np.save(f, classes))
+	save(paths['keys'], lambda f: json.dump([list(key) for key in class_keys], f))
+
+
+class SymmetricGroupTable(object):
+	"""Rank-indexed tables for the symmetric group on {1, ..., n}."""
+
+	def __init__(self, n, directory):
+		paths = table_paths(n, directory)
+		if not all(os.path.exists(path) for path in paths.itervalues()):
+			build_tables(n, directory)
+		self.n = n
+		self.size = srz.factorial(n)
+		self.perms = np.load(paths['perms'], mmap_mode='r')
+		self.mult = np.load(paths['mult'], mmap_mode='r')
+		self.inv = np.load(paths['inv'], mmap_mode='r')
+		self.classes = np.load(paths['classes'], mmap_mode='r')
+		with open(paths['keys'], 'r') as file_in:
+			self.keys = [tuple(key) for key in json.load(file_in)]
+
+	def rank(self, perm):
+		"""The rank of a permutation of {1, ..., n}."""
+		return srz.perm_to_int(perm)
+
+	def permutation(self, rank):
+		"""The permutation with a given rank."""
+		perm = fctn.CompactPermutation.from_images(tuple(self.perms[rank].tolist()))
+		perm.rank = int(rank)
+		return perm
+
+	def generate_group(self, ranks):
+		"""The sorted ranks of the group generated by permutations' ranks."""
+		gens = np.unique(np.asarray(ranks, dtype=np.intp))
+		if not len(gens):
+			return gens
+		seen = np.zeros(self.size, dtype=bool)
+		seen[gens] = True
+		frontier = gens
+		while len(frontier):
+			products = np.unique(self.mult[np.ix_(gens, frontier)])
+			frontier = products[~seen[products]]
+			seen[frontier] = True
+		return np.nonzero(seen)[0]
+
+	def cyclic_group(self, rank):
+		"""The sorted ranks of the cyclic group generated by a permutation's rank."""
+		powers = [rank]
+		g = self.mult[rank, rank]
+		while g != rank:
+			powers.append(g)
+			g = self.mult[rank, g]
+		return np.unique(np.array(powers, dtype=np.intp))
+
+	def get_fingerprint(self, ranks):
+		"""A histogram of cycle counts of permutations' ranks."""
+		counts = np.bincount(self.classes[np.asarray(ranks, dtype=np.intp)], minlength=len(self.keys))
+		return cl.Counter({key: int(c) for key, c in zip(self.keys, counts) if c})
+
+
+@memoized
+def load(n, directory):
+	"""The tables for S_n kept in a directory, building them if needed."""
+	return SymmetricGroupTable(n, directory)
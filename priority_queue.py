@@ -4,105 +4,172 @@ Author: Matt Christie, 2015-2016
 A heap-based priority queue.
 """
 
+class Handle(object):
+	"""An item in a heap, which knows where it is in the heap."""
+	__slots__ = ('item', 'key', 'index')
+
+	def __init__(self, item, key):
+		self.item = item
+		self.key = key
+		self.index = -1  # -1 once the item is out of the heap
+
+	def __repr__(self):
+		return "%s(%r)" % (self.__class__.__name__, self.item)
+
+
 class Heap(object):
-	"""A heap."""
-	# https://en.wikipedia.org/wiki/Heap_(data_structure)
+	"""A d-ary heap of handles."""
+	# https://en.wikipedia.org/wiki/D-ary_heap
+	# The children of index i are d*i + 1, ..., d*i + d. Keys are computed
+	# once per item and cached in its handle, and every move of a handle
+	# updates its index, so handles stay valid.
 
-	def __init__(self, key=lambda item: item):
-		self.items = ['Not used']
+	def __init__(self, key=lambda item: item, d=4):
+		if d < 2:
+			raise ValueError("a heap needs at least 2 children per node")
+		self.items = []
 		self.eval = key
-	
+		self.d = d
+
 	def heapify_up(self, i):
-		"""Restore heap property in tree above index i."""
-		# Returns the least index of the last pair of elements reordered,
-		# i if nothing was reordered.
-		if i > 1:
-			j = i/2
-			if self.eval(self.items[i]) < self.eval(self.items[j]):
-				tmp = self.items[i]
-				self.items[i] = self.items[j]
-				self.items[j] = tmp
-				return self.heapify_up(j)
+		"""Restore heap property in tree above index i; return the handle's new index."""
+		items, d = self.items, self.d
+		handle = items[i]
+		key = handle.key
+		while i > 0:
+			j = (i - 1) // d
+			parent = items[j]
+			if not key < parent.key:
+				break
+			items[i] = parent
+			parent.index = i
+			i = j
+		items[i] = handle
+		handle.index = i
 		return i
-	
+
 	def heapify_down(self, i):
-		"""Restore heap property in tree below index i."""
-		# Returns the greatest index of the last pair of elements reordered,
-		# i if nothing was reordered.
-		n = len(self.items)
-		if 2 * i >= n:  # if i is a leaf node
-			return i
-		elif 2 * i + 1 < n:  # else if i has two children
-			left, right = 2 * i, 2 * i + 1
-			if self.eval(self.items[right]) < self.eval(self.items[left]):
-				j = right
-			else:
-				j = left
-		else:  # i only has a left child
-			j = 2 * i
-		# j is the least-valued child
-		if self.eval(self.items[j]) < self.eval(self.items[i]):
-			tmp = self.items[i]
-			self.items[i] = self.items[j]
-			self.items[j] = tmp
-			return self.heapify_down(j)
+		"""Restore heap property in tree below index i; return the handle's new index."""
+		items, d = self.items, self.d
+		n = len(items)
+		handle = items[i]
+		key = handle.key
+		while True:
+			first = d * i + 1
+			if first >= n:  # i is a leaf node
+				break
+			# j is the least-valued child
+			j, least = first, items[first].key
+			for c in xrange(first + 1, min(first + d, n)):
+				if items[c].key < least:
+					j, least = c, items[c].key
+			if not least < key:
+				break
+			items[i] = items[j]
+			items[i].index = i
+			i = j
+		items[i] = handle
+		handle.index = i
 		return i
 
+	def restore(self, i):
+		"""Restore heap property around index i, whose key may have gone either way."""
+		if i > 0 and self.items[i].key < self.items[(i - 1) // self.d].key:
+			return self.heapify_up(i)
+		return self.heapify_down(i)
+
+	def heapify(self):
+		"""Restore heap property everywhere in O(n)."""
+		for i, handle in enumerate(self.items):
+			handle.index = i
+		for i in xrange((len(self.items) - 2) // self.d, -1, -1):
+			self.heapify_down(i)
+
+
 class PriorityQueue(object):
 	"""A priority queue."""
 	# https://en.wikipedia.org/wiki/Priority_queue
+	# put returns a handle for the item, good until the item leaves the
+	# queue, that can be passed to update, decrease_key and remove.
+
+	def __init__(self, key=lambda item: item, items=(), d=4):
+		self.heap = Heap(key=key, d=d)
+		self.heapify(items)
 
-	def __init__(self, key=lambda item: item):
-		self.heap = Heap(key=key)
-	
 	def put(self, item):
-		"""Add an element."""
-		end = len(self.heap.items)
-		self.heap.items.append(item)
-		return self.heap.heapify_up(end)
-	
+		"""Add an element; get its handle."""
+		handle = Handle(item, self.heap.eval(item))
+		self.heap.items.append(handle)
+		self.heap.heapify_up(len(self.heap.items) - 1)
+		return handle
+
+	def heapify(self, items):
+		"""Add many elements at once in linear time; get their handles."""
+		handles = [Handle(item, self.heap.eval(item)) for item in items]
+		self.heap.items.extend(handles)
+		self.heap.heapify()
+		return handles
+
 	def peek(self):
 		"""Look at the least element."""
-		return self.heap.items[1]
-	
+		return self.heap.items[0].item
+
 	def get(self):
 		"""Pop the least element."""
-		top = self.heap.items[1]
-		self.delete(1)
-		return top		
-
-	def delete(self, i):
-		"""Delete the element at index i in the heap."""
-		if i == len(self.heap.items) - 1:
-			return self.heap.items.pop()
-		deleted = self.heap.items[i]
-		self.heap.items[i] = self.heap.items.pop()
-		key = self.heap.eval
-		if i == 1:
-			self.heap.heapify_down(i)
-		elif key(self.heap.items[i]) < key(self.heap.items[i/2]):
-			self.heap.heapify_up(i)
-		else:
-			self.heap.heapify_down(i)
-		return deleted
-	
+		return self.remove(self.heap.items[0])
+
+	def remove(self, handle):
+		"""Remove the element with a handle from the queue; get the element."""
+		i = self.check(handle)
+		last = self.heap.items.pop()
+		if last is not handle:
+			self.heap.items[i] = last
+			last.index = i
+			self.heap.restore(i)
+		handle.index = -1
+		return handle.item
+
+	def update(self, handle, item=None):
+		"""Reposition an element whose key may have changed, or replace it with item."""
+		i = self.check(handle)
+		if item != None:
+			handle.item = item
+		handle.key = self.heap.eval(handle.item)
+		self.heap.restore(i)
+
+	def decrease_key(self, handle, item):
+		"""Replace an element with one whose key is no greater."""
+		i = self.check(handle)
+		key = self.heap.eval(item)
+		if handle.key < key:
+			raise ValueError("new key is greater than the current key")
+		handle.item = item
+		handle.key = key
+		self.heap.heapify_up(i)
+
+	def check(self, handle):
+		"""The index of a handle in the heap, if it's still there."""
+		i = handle.index
+		if not 0 <= i < len(self.heap.items) or self.heap.items[i] is not handle:
+			raise ValueError("%r is not in the queue" % handle)
+		return i
+
 	def empty(self):
 		"""Determine if the priority queue is empty."""
-		return len(self.heap.items) == 1
-	
+		return not self.heap.items
+
+	def __len__(self):
+		return len(self.heap.items)
+
+	def __contains__(self, handle):
+		i = handle.index
+		return 0 <= i < len(self.heap.items) and self.heap.items[i] is handle
+
 	def __repr__(self):
-		return "%s(%s)" % (self.__class__.__name__, repr(self.heap.items[1:]))
-	
-	def __getitem__(self, i):
-		return self.heap.items[i]
+		return "%s(%s)" % (self.__class__.__name__, repr([h.item for h in self.heap.items]))
 
 
 def items(pq):
 	"""Yield popped items from a priority queue in sorted order."""
 	while not pq.empty():
 		yield pq.get()
-
-
-
-
-
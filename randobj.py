@@ -76,4 +76,21 @@ def random_connected_graph(nodes):
 	return graph
 
 
-
+def random_connected_bitgraph(n):
+	"""A random connected graph on nodes {1, ..., n}, as a bit graph."""
+	# Makes the same random choices as random_connected_graph(range(1, n + 1)),
+	# so both give the same graph from the same random state.
+	nodes = range(1, n + 1)
+	graph = g.BitGraph(n)
+	cur_node = r.choice(nodes)
+	visited = 1 << (cur_node - 1)
+	while visited != (1 << n) - 1:
+		new_node = r.choice(nodes)
+		bit = 1 << (new_node - 1)
+		if not visited & bit:
+			graph.add_edge(cur_node, new_node)
+			visited |= bit
+		cur_node = new_node
+	not_included = [edge for edge in it.combinations(nodes, 2) if not graph.adjacent(*edge)]
+	graph.add_edges(random_subsequence(not_included))
+	return graph
@@ -5,11 +5,14 @@ Serialize some mathematical objects.
 """
 
 import json
+import hashlib
 import collections as cl
 from math import factorial
 
+import numpy as np
+
 import graph as g
-from functions import Permutation
+from functions import Permutation, CompactPermutation
 from cache import memoized
 
 factorial = memoized(factorial)
@@ -21,15 +24,28 @@ factorial = memoized(factorial)
 
 def perm_to_int(perm):
 	"""Encode a permutation as an integer."""
-	perm = list(perm)
-	position = {p: pos for pos, p in enumerate(perm)}
+	# The encoding is the sum over letters v of (v - 1)! times the number
+	# of letters less than v that come after v. Those counts are taken
+	# right to left with a binary indexed tree over the letters seen.
+	compact = type(perm) is CompactPermutation
+	if compact and perm.rank != None:
+		return perm.rank
+	seq = list(perm)
+	n = len(seq)
+	tree = [0] * (n + 1)
 	i = 0
-	for j, k in enumerate(xrange(len(perm) - 1, 0, -1)):
-		pos = position[k + 1]
-		i += factorial(k) * (k - pos)
-		perm.remove(k + 1)
-		for p in perm[pos:]:
-			position[p] -= 1
+	for v in reversed(seq):
+		smaller, j = 0, v - 1
+		while j > 0:
+			smaller += tree[j]
+			j &= j - 1
+		i += factorial(v - 1) * smaller
+		j = v
+		while j <= n:
+			tree[j] += 1
+			j += j & -j
+	if compact:
+		perm.rank = i
 	return i
 
 
@@ -37,29 +53,82 @@ def int_to_perm(i, n=1):
 	"""Decode an integer as a permutation."""
 	while factorial(n) <= i:
 		n += 1
+	# A binary indexed tree counting the empty slots, all n at first
+	tree = [j & -j for j in xrange(n + 1)]
+	top = 1 << (n.bit_length() - 1)
 	perm = [0 for _ in xrange(n)]
-	for k in xrange(n - 1, -1, -1):
-		j, num_zeros = 0, 0
-		kf = factorial(k)
-		# position within the remaining (nonzero) slots
-		pos = k - i / kf
-		i %= kf
-		placed = False
-		while not placed:
-			if perm[j] != 0:
-				j += 1
-			elif num_zeros < pos:
-				num_zeros += 1
-				j += 1
-			else:
-				# pos == num_zeros; you've found the right slot
-				perm[j] = k + 1
-				placed = True
+	for v in xrange(n, 0, -1):
+		vf = factorial(v - 1)
+		# v goes in the empty slot with this many empty slots up to it
+		rest = v - i / vf
+		i %= vf
+		j, step = 0, top
+		while step:
+			if j + step <= n and tree[j + step] < rest:
+				j += step
+				rest -= tree[j]
+			step >>= 1
+		perm[j] = v
+		j += 1
+		while j <= n:
+			tree[j] -= 1
+			j += j & -j
 	return Permutation(perm)
 
 
+# Ranks of permutations on more than 20 letters don't fit in 64 bits.
+max_batch_n = 20
+
+
+def perms_to_ints(arr):
+	"""Encode the rows of an array of 0-based permutation images as integers."""
+	arr = np.asarray(arr, dtype=np.int64)
+	m, n = arr.shape
+	if n > max_batch_n:
+		raise ValueError("can't rank permutations of %s letters in 64 bits" % n)
+	factorials = np.array([factorial(k) for k in xrange(max(n, 1))], dtype=np.int64)
+	ranks = np.zeros(m, dtype=np.int64)
+	for pos in xrange(n - 1):
+		smaller = (arr[:, pos + 1:] < arr[:, pos:pos + 1]).sum(axis=1)
+		ranks += factorials[arr[:, pos]] * smaller
+	return ranks
+
+
+def ints_to_perms(ranks, n):
+	"""Decode integers as the rows of an array of 0-based permutation images."""
+	if n > max_batch_n:
+		raise ValueError("can't unrank permutations of %s letters in 64 bits" % n)
+	ranks = np.asarray(ranks, dtype=np.int64)
+	m = len(ranks)
+	arr = np.zeros((m, n), dtype=np.int64)
+	empty = np.ones((m, n), dtype=bool)
+	rows = np.arange(m)
+	for v in xrange(n, 0, -1):
+		vf = factorial(v - 1)
+		rest = v - (ranks // vf) % v
+		# The first empty slot with rest empty slots up to and including it
+		slot = np.argmax(empty & (np.cumsum(empty, axis=1) == rest[:, np.newaxis]), axis=1)
+		arr[rows, slot] = v - 1
+		empty[rows, slot] = False
+	return arr
+
+
+def cache_ranks(perms):
+	"""Encode compact permutations in batches, caching their ranks."""
+	by_degree = cl.defaultdict(list)
+	for perm in perms:
+		if type(perm) is CompactPermutation and perm.rank == None and len(perm) <= max_batch_n:
+			by_degree[len(perm)].append(perm)
+	for n, batch in by_degree.iteritems():
+		ranks = perms_to_ints([perm.arr for perm in batch])
+		for perm, rank in zip(batch, ranks.tolist()):
+			perm.rank = rank
+
+
 def graph_to_int(graph):
 	"""Encode a graph as an integer."""
+	if type(graph) is g.BitGraph:
+		return graph.to_int()
 	max_node = len(graph.nodes)
 	encoded = 0
 	k = 1
@@ -150,10 +219,22 @@ def xprimes(step=1000):
 		upper += min(upper, step)
 
 
+# Primes found so far, shared by all calls to seq_to_int and int_to_seq
+primes = []
+prime_source = xprimes()
+
+
+def first_primes(k):
+	"""The first k primes."""
+	while len(primes) < k:
+		primes.append(next(prime_source))
+	return primes[:k]
+
+
 def seq_to_int(s):
 	"""Encode a sequence of nonnegative integers as a positive integer."""
 	i = 1
-	for p, j in zip(xprimes(), s):
+	for p, j in zip(first_primes(len(s)), s):
 		i *= p ** j
 	return i
 
@@ -161,28 +242,227 @@ def seq_to_int(s):
 def int_to_seq(i):
 	"""Decode a positive integer as a sequence of nonnegative integers."""
 	s = []
-	prime = xprimes()
 	while i != 1:
 		s.append(0)
-		p = next(prime)
+		first_primes(len(s))
+		p = primes[len(s) - 1]
 		while i % p == 0:
 			s[-1] += 1
 			i /= p
 	return s
 
 
+# A cycle count (c_2, c_3, ...) of a permutation is a partition, with c_k
+# parts equal to k, of the number of letters the permutation moves. The
+# partition encoding numbers these densely: all partitions moving fewer
+# letters come first, then partitions of the same number of letters in
+# order of their parts, largest first.
+
+
+@memoized
+def num_partitions(m, k):
+	"""The number of partitions of m into parts of sizes 2 through k."""
+	if m == 0:
+		return 1
+	if k < 2:
+		return 0
+	if k > m:
+		return num_partitions(m, m)
+	return num_partitions(m, k - 1) + num_partitions(m - k, k)
+
+
+@memoized
+def partition_offset(m):
+	"""The number of partitions into parts of size at least 2 of numbers less than m."""
+	if m == 0:
+		return 0
+	return partition_offset(m - 1) + num_partitions(m - 1, m - 1)
+
+
+def partition_to_int(s):
+	"""Encode a cycle count (c_2, c_3, ...) as a nonnegative integer."""
+	parts = []
+	for k in xrange(len(s) + 1, 1, -1):
+		parts.extend([k] * s[k - 2])
+	m = sum(parts)
+	i = partition_offset(m)
+	for part in parts:
+		# Partitions of what's left whose largest part is smaller come first
+		i += num_partitions(m, part - 1)
+		m -= part
+	return i
+
+
+def int_to_partition(i):
+	"""Decode a nonnegative integer as a cycle count (c_2, c_3, ...)."""
+	m = 0
+	while partition_offset(m + 1) <= i:
+		m += 1
+	i -= partition_offset(m)
+	s = [0] * max(m - 1, 0)
+	largest = m
+	while m > 0:
+		part = min(m, largest)
+		while num_partitions(m, part - 1) > i:
+			part -= 1
+		i -= num_partitions(m, part - 1)
+		s[part - 2] += 1
+		m -= part
+		largest = part
+	while s and s[-1] == 0:
+		s.pop()
+	return s
+
+
+# Encodings of cycle counts, by the names the cycle_encoding setting uses
+cycle_count_encodings = {
+	'primes': (seq_to_int, int_to_seq),
+	'partitions': (partition_to_int, int_to_partition)
+}
+
+
 def encode_objects(objects, encode):
 	"""Encode a set of objects as a string of integers."""
 	ints = [encode(obj) for obj in objects]
 	return json.dumps(sorted(ints))
 
 
+def encode_symbolic_group(kind, n):
+	"""The string representation for S_n (kind 'S') or A_n (kind 'A')."""
+	return '%s%s' % (kind, n)
+
+
 def decode_objects(string, decode):
 	"""Decode a string of integers as a set of objects."""
 	ints = json.loads(string)
 	return {decode(i) for i in ints}
 
 
+# Binary group representations start with a tag byte. 'R' is followed by
+# the sorted ranks of the group's elements as varints, each but the first
+# relative to the one before. 'L' is laid out like 'R', for groups with
+# ranks too big for 64 bits; it's packed and unpacked without NumPy. 'B'
+# is followed by a varint n and a bitmap over the ranks of S_n. 'S' and
+# 'A' are followed by n in decimal, as in encode_symbolic_group.
+
+# The largest rank the NumPy encodings can hold
+max_int64 = (1 << 63) - 1
+
+
+def varint_bytes(ints):
+	"""Pack nonnegative integers as little-endian base 128 varints."""
+	ints = np.asarray(ints, dtype=np.uint64)
+	lengths = np.ones(len(ints), dtype=np.intp)
+	rest = ints >> np.uint64(7)
+	while rest.any():
+		lengths += rest > 0
+		rest >>= np.uint64(7)
+	starts = np.cumsum(lengths) - lengths
+	out = np.zeros(lengths.sum(), dtype=np.uint8)
+	for j in xrange(lengths.max() if len(ints) else 0):
+		has = lengths > j
+		chunk = (ints[has] >> np.uint64(7 * j)) & np.uint64(0x7f)
+		more = np.where(lengths[has] > j + 1, 0x80, 0).astype(np.uint64)
+		out[starts[has] + j] = chunk | more
+	return out.tostring()
+
+
+def bytes_varints(data, offset=0):
+	"""Unpack the varints in a buffer, starting at an offset."""
+	data = np.frombuffer(data, dtype=np.uint8, offset=offset)
+	if not len(data):
+		return np.zeros(0, dtype=np.int64)
+	ends = np.nonzero(data < 0x80)[0]
+	if not len(ends):
+		return np.zeros(0, dtype=np.int64)
+	data = data[:ends[-1] + 1]
+	starts = np.concatenate(([0], ends[:-1] + 1))
+	shifts = 7 * (np.arange(len(data)) - np.repeat(starts, ends - starts + 1))
+	values = (data & 0x7f).astype(np.int64) << shifts
+	return np.add.reduceat(values, starts)
+
+
+def long_varint_bytes(ints):
+	"""Pack nonnegative integers of any size as little-endian base 128 varints."""
+	out = bytearray()
+	for i in ints:
+		while i >= 0x80:
+			out.append(i & 0x7f | 0x80)
+			i >>= 7
+		out.append(i)
+	return str(out)
+
+
+def bytes_long_varints(data, offset=0):
+	"""Unpack varints of any size in a buffer, starting at an offset."""
+	ints = []
+	i, shift = 0, 0
+	for byte in bytearray(data[offset:]):
+		i |= (byte & 0x7f) << shift
+		shift += 7
+		if byte < 0x80:
+			ints.append(i)
+			i, shift = 0, 0
+	return ints
+
+
+def encode_group(ranks):
+	"""A binary representation of a group given by its elements' ranks."""
+	ranks = list(ranks)
+	if ranks and max(ranks) > max_int64:
+		ranks = sorted(set(ranks))
+		deltas = [b - a for a, b in zip([0] + ranks, ranks)]
+		return 'L' + long_varint_bytes(deltas)
+	ranks = np.unique(np.asarray(ranks, dtype=np.int64))
+	deltas = np.diff(np.concatenate(([0], ranks)))
+	packed = varint_bytes(deltas)
+	n = 1
+	while len(ranks) and factorial(n) <= ranks[-1]:
+		n += 1
+	# Dense groups take fewer bytes as bitmaps
+	if n <= max_batch_n and factorial(n) / 8 + 2 < len(packed):
+		bitmap = np.zeros(factorial(n), dtype=bool)
+		bitmap[ranks] = True
+		return 'B' + varint_bytes([n]) + np.packbits(bitmap).tostring()
+	return 'R' + packed
+
+
+def alternating_ranks(n):
+	"""The sorted ranks of the even permutations on n letters."""
+	ranks = np.arange(factorial(n), dtype=np.int64)
+	# The digits of a rank count the inversions of its permutation.
+	inversions = np.zeros(len(ranks), dtype=np.int64)
+	for v in xrange(2, n + 1):
+		inversions += (ranks // factorial(v - 1)) % v
+	return ranks[inversions % 2 == 0]
+
+
+def decode_group(data):
+	"""The sorted ranks of a group's elements from its binary representation."""
+	# Ranks too big for int64 come back as Python integers in an object array.
+	tag = data[:1]
+	if tag == 'R':
+		return np.cumsum(bytes_varints(data, 1))
+	if tag == 'L':
+		ranks = np.array(bytes_long_varints(data, 1), dtype=object)
+		return np.cumsum(ranks) if len(ranks) else ranks
+	if tag == 'B':
+		n = int(bytes_varints(data[:4], 1)[0])
+		start = 2 if n < 128 else 3
+		bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, offset=start))
+		return np.nonzero(bits[:factorial(n)])[0].astype(np.int64)
+	if tag == 'S':
+		return np.arange(factorial(int(data[1:])), dtype=np.int64)
+	if tag == 'A':
+		return alternating_ranks(int(data[1:]))
+	raise ValueError("unknown group representation tag %r" % tag)
+
+
+def group_digest(data):
+	"""A 128-bit digest of a group's representation, for looking the group up."""
+	return hashlib.md5(data).digest()
+
+
 def encode_group_class(group_class):
 	"""The string representation for a group's class."""
 	itemized = [[list(key), val] for key, val in group_class.iteritems()]
@@ -0,0 +1,68 @@
+"""
+Author: Matt Christie, 2016
+
+Test to make sure that the traversal group cache gives the groups it
+should, including for an empty set of generators.
+"""
+
+import logging
+
+import functions as fctn
+from traversalgroup import GroupCache, stream_group
+
+
+logging.basicConfig(level=logging.DEBUG)
+
+
+def generate(perms):
+	"""Generate a group the way the experiment does without tables."""
+	return fctn.generate_group(perms)
+
+
+def test_empty_generators():
+	"""An empty generator set is neither cached nor used to seed other groups."""
+	cache = GroupCache()
+	assert cache.get(set(), 3, generate) == set()
+	assert not cache.groups
+	swap = fctn.CompactPermutation([2, 1, 3])
+	group = cache.get({swap}, 3, generate)
+	assert group == generate([swap])
+	assert cache.seeded == 0
+	logging.info("Empty generator set handled.")
+
+
+def test_seeded():
+	"""A group seeded from a cached subgroup is the group generated from scratch."""
+	cache = GroupCache()
+	swap = fctn.CompactPermutation([2, 1, 3])
+	cycle = fctn.CompactPermutation([2, 3, 1])
+	cache.get({swap}, 3, generate)
+	group = cache.get({swap, cycle}, 3, generate)
+	assert cache.seeded == 1
+	assert group == generate([swap, cycle])
+	assert len(group) == 6
+	logging.info("Seeded group is correct.")
+
+
+def test_max_order():
+	"""Groups over max_order are neither seeded, returned nor cached."""
+	cache = GroupCache(max_order=2)
+	generate = lambda perms: stream_group(perms, 2)
+	swap = fctn.CompactPermutation([2, 1, 3])
+	cycle = fctn.CompactPermutation([2, 3, 1])
+	assert len(cache.get({swap}, 3, generate)) == 2
+	assert cache.get({swap, cycle}, 3, generate) == None
+	assert cache.seeded == 0
+	assert len(cache.groups) == 1
+	logging.info("Groups over max_order abandoned.")
+
+
+def main():
+	"""Test the group cache."""
+	test_empty_generators()
+	test_seeded()
+	test_max_order()
+
+
+if __name__ == '__main__':
+	main()
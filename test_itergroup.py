@@ -0,0 +1,63 @@
+"""
+Author: Matt Christie, 2016
+
+Test to make sure that streaming a group's elements stops where each
+stop predicate says it should.
+"""
+
+import sys
+import logging
+
+import functions as fctn
+
+
+logging.basicConfig(level=logging.DEBUG)
+
+
+def is_odd(perm):
+	"""Determine if a permutation is odd."""
+	n = fctn.degree_of([perm])
+	return sum(length - 1 for length in fctn.cycle_lengths(fctn.images(perm, n))) % 2 == 1
+
+
+def test_contains_odd():
+	"""Enumeration stops at the first odd element, and not at all in a group of even ones."""
+	three_cycle = fctn.CompactPermutation([2, 3, 1, 4])
+	other = fctn.CompactPermutation([1, 3, 4, 2])
+	odd = fctn.ContainsOdd()
+	elements = list(fctn.iter_group([three_cycle, other], stop=[odd]))
+	assert len(elements) == 12
+	assert not odd.triggered
+	swap = fctn.CompactPermutation([2, 1, 3, 4])
+	odd = fctn.ContainsOdd()
+	elements = list(fctn.iter_group([three_cycle, swap], stop=[odd]))
+	assert odd.triggered
+	assert is_odd(elements[-1])
+	assert not any(is_odd(elt) for elt in elements[:-1])
+	logging.info("ContainsOdd stops at the first odd element.")
+
+
+def test_memory_exceeds():
+	"""Enumeration stops at the first element that takes the elements over the budget."""
+	gens = [fctn.CompactPermutation([2, 1, 3, 4, 5]), fctn.CompactPermutation([2, 3, 4, 5, 1])]
+	per_element = sys.getsizeof(tuple(xrange(5))) + 3 * sys.getsizeof(None)
+	for k in (0, 1, 7):
+		budget = k * per_element
+		too_big = fctn.MemoryExceeds(budget)
+		elements = list(fctn.iter_group(gens, stop=[too_big]))
+		assert too_big.triggered
+		assert len(elements) == k + 1
+	too_big = fctn.MemoryExceeds(120 * per_element)
+	assert len(list(fctn.iter_group(gens, stop=[too_big]))) == 120
+	assert not too_big.triggered
+	logging.info("MemoryExceeds stops at the budget.")
+
+
+def main():
+	"""Test the stop predicates of iter_group."""
+	test_contains_odd()
+	test_memory_exceeds()
+
+
+if __name__ == '__main__':
+	main()
@@ -1,82 +1,163 @@
 """
 Author: Matt Christie, 2016
 
-Test to make sure that the priority queue functions as it should.
+Test to make sure that the priority queue functions as it should,
+by running it side by side with heapq, and time the two.
 """
 
 import sys
-import json
+import time
+import heapq
 import logging
 import random as r
-import itertools as it
 
 from priority_queue import PriorityQueue
 
 
 bound = 2 ** 64
-max_print = 15
-insert_prob = 0.75
+# Chances of each action on the queues; the rest are inserts
+action_probs = [('get', 0.2), ('remove', 0.1), ('decrease', 0.1), ('update', 0.1)]
 logging.basicConfig(level=logging.DEBUG)
 
 
-def insert(pq):
-	"""Randomly insert an integer into the priority queue."""
-	i = r.randint(0, bound-1)
-	pq.put(i)
-	logging.info("insert %s", i)
+class Differential(object):
+	"""A priority queue and a heapq list that should always agree."""
+
+	def __init__(self, items=()):
+		items = list(items)
+		self.pq = PriorityQueue()
+		self.handles = self.pq.heapify(items)
+		self.ref = list(items)
+		heapq.heapify(self.ref)
+
+	def insert(self):
+		"""Insert a random integer into both queues."""
+		i = r.randint(0, bound - 1)
+		self.handles.append(self.pq.put(i))
+		heapq.heappush(self.ref, i)
+
+	def get(self):
+		"""Pop the least integer from both queues."""
+		if self.ref:
+			popped = self.pq.get()
+			expected = heapq.heappop(self.ref)
+			if popped != expected:
+				raise AssertionError("got %s, expected %s" % (popped, expected))
+
+	def pick(self):
+		"""A random handle still in the queue, and its item; None if there are none."""
+		self.handles = [h for h in self.handles if h in self.pq]
+		if not self.handles:
+			return None
+		handle = r.choice(self.handles)
+		return handle, handle.item
+
+	def replace(self, old, new):
+		"""Replace an item in the heapq list."""
+		self.ref[self.ref.index(old)] = new
+		heapq.heapify(self.ref)
+
+	def remove(self):
+		"""Remove a random integer from both queues."""
+		picked = self.pick()
+		if picked != None:
+			handle, item = picked
+			self.pq.remove(handle)
+			self.ref.remove(item)
+			heapq.heapify(self.ref)
+
+	def decrease(self):
+		"""Decrease a random integer in both queues."""
+		picked = self.pick()
+		if picked != None:
+			handle, item = picked
+			new = r.randint(0, item)
+			self.pq.decrease_key(handle, new)
+			self.replace(item, new)
+
+	def update(self):
+		"""Change a random integer in both queues to any integer."""
+		picked = self.pick()
+		if picked != None:
+			handle, item = picked
+			new = r.randint(0, bound - 1)
+			self.pq.update(handle, new)
+			self.replace(item, new)
+
+	def check(self):
+		"""Make sure the queues agree on their size and least element."""
+		if len(self.pq) != len(self.ref):
+			raise AssertionError("%s items, expected %s" % (len(self.pq), len(self.ref)))
+		if self.ref and self.pq.peek() != self.ref[0]:
+			raise AssertionError("least %s, expected %s" % (self.pq.peek(), self.ref[0]))
+
+
+def random_action():
+	"""The name of a random action."""
+	p = r.random()
+	for action, prob in action_probs:
+		if p < prob:
+			return action
+		p -= prob
+	return 'insert'
 
 
-def delete(pq):
-	"""Randomly delete an element from the priority queue."""
-	if not pq.empty():
-		n = len(pq.heap.items)
-		index = r.randint(1, n-1)
-		deleted = pq.delete(index)
-		logging.info("delete %s, got %s", index, deleted)
-
-
-def insert_delete(pq, num_actions):
-	"""Perform a random sequence of inserts/updates on the priority queue."""
+def trial(trial_no, num_actions):
+	"""Perform one test run of the priority queue against heapq."""
+	logging.info("Trial %s", trial_no)
+	diff = Differential(r.randint(0, bound - 1) for _ in xrange(num_actions // 10))
 	for _ in xrange(num_actions):
-		p = r.random()
-		action = insert if p < insert_prob else delete
-		action(pq)
+		getattr(diff, random_action())()
+		diff.check()
+	while diff.ref:
+		diff.get()
+	diff.check()
+	logging.info("Order preserved over %s actions.", num_actions)
 
 
-def log_items(items):
-	"""Log items if there are few enough to be printed."""
-	if len(items) < max_print:
-		logging.info("ITEMS : %s", json.dumps(items))
+def timed(func, *args):
+	"""The seconds a call takes."""
+	start = time.time()
+	func(*args)
+	return time.time() - start
 
 
-def trial(trial_no, num_actions):
-    """Perform one test run of the priority queue."""
-	logging.info("Trial %s", trial_no)
+def pq_sort(nums):
+	"""Sort by putting into and getting from a priority queue."""
 	pq = PriorityQueue()
-	insert_delete(pq, int(num_actions))
-	items = []
-	while not pq.empty():
-		items.append(pq.get())
-	if len(items) < 2:
-		logging.info("Order is trivially preserved; fewer than 2 items.")
-	preserved = True
-	for i1, i2 in it.izip(items, items[1:]):
-		if i1 >= i2:
-			preserved = False
-			break
-	logging.info("Order%s preserved.", {True: "", False: " not"}[preserved])
-	log_items(items)
+	for i in nums:
+		pq.put(i)
+	return [pq.get() for _ in nums]
+
+
+def heapq_sort(nums):
+	"""Sort by pushing onto and popping from a heapq list."""
+	heap = []
+	for i in nums:
+		heapq.heappush(heap, i)
+	return [heapq.heappop(heap) for _ in nums]
+
+
+def heapq_heapify(nums):
+	"""Heapify a copy of a list with heapq."""
+	heapq.heapify(list(nums))
+
+
+def log_timings(num_items):
+	"""Log how long the priority queue and heapq take on the same work."""
+	nums = [r.randint(0, bound - 1) for _ in xrange(num_items)]
+	logging.info("put/get %s items: PriorityQueue %.3fs, heapq %.3fs",
+	             num_items, timed(pq_sort, nums), timed(heapq_sort, nums))
+	logging.info("heapify %s items: PriorityQueue %.3fs, heapq %.3fs",
+	             num_items, timed(PriorityQueue, lambda item: item, nums), timed(heapq_heapify, nums))
 
 
 def main(num_trials, num_actions):
-    """Test the priority queue."""
+	"""Test the priority queue."""
 	for i in xrange(int(num_trials)):
-		trial(i+1, int(num_actions))
+		trial(i + 1, int(num_actions))
+	log_timings(int(num_actions))
 
 
 if __name__ == '__main__':
 	main(*sys.argv[1:])
-		
-
-
-
@@ -0,0 +1,52 @@
+"""
+Author: Matt Christie, 2016
+
+Test to make sure that groups survive being encoded and decoded,
+including groups with ranks too big for 64 bits.
+"""
+
+import logging
+
+import functions as fctn
+import serialize as srz
+
+
+logging.basicConfig(level=logging.DEBUG)
+
+
+def round_trip(group):
+	"""The ranks of a group's elements, and those decoded from its binary representation."""
+	ranks = sorted(srz.perm_to_int(perm) for perm in group)
+	return ranks, [int(rank) for rank in srz.decode_group(srz.encode_group(ranks))]
+
+
+def test_small_group():
+	"""A group on a few letters comes back with the same ranks."""
+	gens = [fctn.CompactPermutation([2, 1, 3, 4]), fctn.CompactPermutation([1, 3, 4, 2])]
+	ranks, decoded = round_trip(fctn.generate_group(gens))
+	assert decoded == ranks
+	logging.info("Small group encoded and decoded.")
+
+
+def test_large_ranks():
+	"""A group on 21 or more letters, with ranks past 2**63, comes back with the same ranks."""
+	for n in (21, 25):
+		reversal = fctn.CompactPermutation(range(n, 0, -1))
+		cycle = fctn.CompactPermutation(range(2, n + 1) + [1])
+		group = fctn.generate_group([reversal, cycle])
+		ranks, decoded = round_trip(group)
+		assert len(ranks) == 2 * n
+		assert max(ranks) > srz.max_int64
+		assert srz.encode_group(ranks)[:1] == 'L'
+		assert decoded == ranks
+	logging.info("Groups with large ranks encoded and decoded.")
+
+
+def main():
+	"""Test the binary group encoding."""
+	test_small_group()
+	test_large_ranks()
+
+
+if __name__ == '__main__':
+	main()
@@ -17,14 +17,16 @@ import collections as cl
 
 import numpy as np
 from sqlalchemy import create_engine, Table, MetaData, select, and_
+from sqlalchemy.exc import IntegrityError
 
 import ddl
 import randobj
+import grouptable as gt
 import graph as g
 import serialize as srz
 import functions as fctn
-from cache import lru_cache
-from outtools import ProgressTallier
+from cache import lru_cache, PersistentCache, SharedCache
+from outtools import ProgressTallier, notify_now
 
 
 """
@@ -51,20 +53,24 @@ TODO
 """
 
 
-def cache_except_none(method):
-    """Cache the return value of a method, except when the return value is None."""
-    return lru_cache(method, include_nones=False)
-    
+def cache_except_none(maxsize):
+    """Cache the return values of a method, except when the return value is None."""
+    return lru_cache(maxsize=maxsize, include_nones=False)
 
 
 class TableHandler(object):
     """The interface to a table in the database."""
     
+    # How cycle counts are encoded in decomp columns
+    encode_cycle_count = staticmethod(srz.seq_to_int)
+    
     def __init__(self, engine, meta, conn):
         self.table = Table(self.name, meta, autoload=True, autoload_with=engine)
         self.conn = conn
     
-    @cache_except_none
+    # Every element of every new group is looked up in Permutation, so
+    # this cache holds at least the elements of S_7.
+    @cache_except_none(maxsize=20000)
     def exists(self, **keys):
         """Determine if the object exists in the database."""
         eps = self.exists_params
@@ -106,11 +112,22 @@ class GraphHandler(TableHandler):
 class PermGroupHandler(TableHandler):
     """The PermGroup table handler."""
     name = 'PermGroup'
-    exists_params = ['repr']
+    exists_params = ['digest', 'repr']
+    
+    def exists(self, repr):
+        """Determine if a group with some representation exists in the database."""
+        # Groups are found through the digest index, and only the groups
+        # with a matching digest have their representations compared.
+        c = self.table.c
+        s = select([c.id]).where(and_(c.digest == srz.group_digest(repr), c.repr == repr))
+        res = self.conn.execute(s).first()
+        return res[0] if res else None
     
     def generate_data(self, obj):
         """Generate data to insert into the PermGroup table."""
-        yield obj
+        data = dict(obj)
+        data['digest'] = srz.group_digest(obj['repr'])
+        yield data
 
 
 class PermutationHandler(TableHandler):
@@ -120,11 +137,13 @@ class PermutationHandler(TableHandler):
     
     def generate_data(self, obj):
         """Generate data to insert into the Permutation table."""
-        data = {
-            'id': srz.perm_to_int(obj),
-            'cycle_decomp': srz.seq_to_int(obj.cycle_decomposition.count)
-        }
-        yield data
+        perms = list(obj)
+        for perm, cycle_count in zip(perms, fctn.cycle_type_keys(perms)):
+            data = {
+                'id': srz.perm_to_int(perm),
+                'cycle_decomp': self.encode_cycle_count(cycle_count)
+            }
+            yield data
 
 
 class GroupClassHandler(TableHandler):
@@ -149,7 +168,7 @@ class HistogramHandler(TableHandler):
     def generate_data(self, obj):
         """Generate data to insert into the Histogram table."""
         for cycle_decomp, count in obj['fingerprint'].iteritems():
-            decomp = srz.seq_to_int(cycle_decomp)
+            decomp = self.encode_cycle_count(cycle_decomp)
             yield {'id': obj['id'], 'decomp': decomp, 'count': count}
 
 
@@ -175,17 +194,169 @@ class TrialHandler(TableHandler):
         yield obj
 
 
+class EstimateHandler(TableHandler):
+    """The Estimate table handler."""
+    name = 'Estimate'
+    exists_params = ['trial']
+    
+    def generate_data(self, obj):
+        """Generate data to insert into the Estimate table."""
+        estimate = obj['estimate']
+        data = {
+            'trial': obj['trial'],
+            'samples': estimate.samples,
+            'size': estimate.order,
+            'size_low': estimate.low,
+            'size_high': estimate.high
+        }
+        yield data
+
+
+class EstimateHistogramHandler(TableHandler):
+    """The EstimateHistogram table handler."""
+    name = 'EstimateHistogram'
+    exists_params = ['id', 'decomp']
+    
+    def generate_data(self, obj):
+        """Generate data to insert into the EstimateHistogram table."""
+        for cycle_decomp, (share, low, high) in obj['fingerprint'].iteritems():
+            decomp = self.encode_cycle_count(cycle_decomp)
+            yield {
+                'id': obj['id'], 'decomp': decomp,
+                'share': share, 'share_low': low, 'share_high': high
+            }
+
+
 tables = [
     'Graph', 'PermGroup', 'Permutation',
-    'GroupClass', 'Histogram', 'GroupElement', 'Trial'
+    'GroupClass', 'Histogram', 'GroupElement', 'Trial',
+    'Estimate', 'EstimateHistogram'
 ]
 handlers = {tbl: globals()['%sHandler' % tbl] for tbl in tables}
 
 
-def generate_group(method, nodes):
-    """G's traversal group on a subset of its nodes."""
-    perms = {fctn.Permutation(list(method(node))) for node in nodes}
-    return fctn.generate_group(perms)
+def traversal_permutations(matrix):
+    """The traversal permutations in the rows of a traversal matrix."""
+    return {fctn.CompactPermutation(row) for row in matrix.tolist()}
+
+
+def generate_group(perms, mode='chain', table=None):
+    """The traversal group generated by traversal permutations."""
+    if table != None:
+        ranks = table.generate_group([table.rank(perm) for perm in perms])
+        return {table.permutation(rank) for rank in ranks}
+    return fctn.generate_group(perms, mode=mode)
+
+
+def stream_group(perms, max_order):
+    """The traversal group generated by perms, or None if it has over max_order elements."""
+    too_big = fctn.OrderExceeds(max_order)
+    group = set(fctn.iter_group(perms, stop=[too_big]))
+    if too_big.triggered:
+        return None
+    return group
+
+
+def get_fingerprint(group, table=None):
+    """A histogram of cycle counts of permutations in a traversal group."""
+    if table != None:
+        return table.get_fingerprint([srz.perm_to_int(perm) for perm in group])
+    return fctn.get_fingerprint(group)
+
+
+class GroupCache(object):
+    """A bounded cache of traversal groups keyed by their generators' ranks."""
+    # The experiment finds the ids of groups it has seen by their
+    # generators in its result cache first, so this cache mostly serves
+    # as a source of subgroups to extend (see seed), and rarely has hits.
+    
+    def __init__(self, maxsize=50000, max_order=None):
+        # Groups are evicted least recently used first once the cache
+        # holds more than maxsize group elements in total. Groups with
+        # more than max_order elements are neither returned nor cached.
+        self.groups = cl.OrderedDict()
+        self.maxsize = maxsize
+        self.max_order = max_order
+        self.size = 0
+        self.hits = 0
+        self.seeded = 0
+        self.misses = 0
+    
+    def key(self, perms, n):
+        """The canonical key for the group generated by permutations of n letters."""
+        return n, frozenset(srz.perm_to_int(perm) for perm in perms)
+    
+    def seed(self, key):
+        """The largest cached group generated by a nonempty proper subset of the generators in key."""
+        # Only groups containing the identity can be extended by Dimino's algorithm.
+        n, ranks = key
+        seed = None
+        for (m, seed_ranks), (gens, group) in self.groups.iteritems():
+            if m == n and seed_ranks and seed_ranks < ranks:
+                if seed == None or len(group) > len(seed[2]):
+                    if fctn.identity_like(gens[0]) in group:
+                        seed = seed_ranks, gens, group
+        return seed
+    
+    def get(self, perms, n, generate):
+        """The group generated by permutations of n letters, using generate on a miss."""
+        # generate may give up and return None, which isn't cached. Nor is
+        # the group of an empty set of generators, which can't seed others.
+        key = self.key(perms, n)
+        if not key[1]:
+            return generate(perms)
+        if key in self.groups:
+            self.hits += 1
+            gens, group = self.groups.pop(key)
+            self.groups[key] = gens, group
+            return group
+        # Extending a seed can't stop early, so there's no seeding under max_order.
+        seed = self.seed(key) if self.max_order == None else None
+        if seed != None:
+            # Extend the cached subgroup by the remaining generators
+            self.seeded += 1
+            seed_ranks, gens, group = seed
+            gens = list(gens)
+            for perm in perms:
+                if srz.perm_to_int(perm) not in seed_ranks:
+                    group = fctn.extend_group(group, gens, perm)
+                    gens.append(perm)
+        else:
+            self.misses += 1
+            group = generate(perms)
+            if group == None or self.max_order != None and len(group) > self.max_order:
+                return None
+        self.groups[key] = list(perms), group
+        self.size += len(group)
+        while self.size > self.maxsize and len(self.groups) > 1:
+            _, (_, evicted) = self.groups.popitem(last=False)
+            self.size -= len(evicted)
+        return group
+    
+    def report(self, stored=0):
+        """A summary of how well the cache is doing, given the lookups answered before it."""
+        # stored counts the groups found by their generators elsewhere
+        # (the result cache), which never reach this cache.
+        found = stored + self.hits
+        lookups = found + self.seeded + self.misses
+        hit_rate = float(found) / lookups if lookups else 0.0
+        msg = ('Group cache: %s stored, %s hits, %s seeded, %s misses (hit rate %.3f), '
+               '%s groups, %s elements')
+        return msg % (stored, self.hits, self.seeded, self.misses, hit_rate,
+                      len(self.groups), self.size)
+
+
+def symmetric_kind(order, m):
+    """('S', m) or ('A', m) if a group moving only {1, ..., m} is S_m or A_m."""
+    # Such a group is a subgroup of S_m, and A_m is the only subgroup of
+    # S_m of index 2. Trivial groups are left alone.
+    if m < 2:
+        return None
+    if order == srz.factorial(m):
+        return 'S', m
+    if 2 * order == srz.factorial(m):
+        return 'A', m
+    return None
 
 
 def init_db(dbname):
@@ -194,6 +365,142 @@ def init_db(dbname):
         conn.executescript(ddl.script)
 
 
+def add_group_digests(dbname):
+    """Add the digest column to the PermGroup table of a database made without it."""
+    with sqlite3.connect(dbname) as conn:
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(PermGroup)')]
+        if not columns or 'digest' in columns:
+            return
+        conn.execute('ALTER TABLE PermGroup ADD COLUMN digest BLOB')
+        rows = conn.execute('SELECT id, repr FROM PermGroup').fetchall()
+        digests = [(sqlite3.Binary(srz.group_digest(str(group_repr))), group_id)
+                   for group_id, group_repr in rows]
+        conn.executemany('UPDATE PermGroup SET digest = ? WHERE id = ?', digests)
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS UniqueGroup ON PermGroup(digest, repr)')
+
+
+def merge_duplicate_groups(dbname):
+    """Merge PermGroup rows with the same representation; the number of rows merged."""
+    # Databases made with only a plain index on digest could get the same
+    # group twice from workers racing to add it. Each group's trials are
+    # pointed to its first row, and the others are deleted, so that the
+    # unique index can be built.
+    with sqlite3.connect(dbname) as conn:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        if 'UniqueGroup' in indexes:
+            return 0
+        duplicates = conn.execute(
+            'SELECT p.id, MIN(q.id) FROM PermGroup p JOIN PermGroup q '
+            'ON q.digest = p.digest AND q.repr = p.repr AND q.id < p.id GROUP BY p.id').fetchall()
+        for group_id, first_id in duplicates:
+            conn.execute('UPDATE Trial SET grp = ? WHERE grp = ?', (first_id, group_id))
+            conn.execute('DELETE FROM GroupElement WHERE grp = ?', (group_id,))
+            conn.execute('DELETE FROM PermGroup WHERE id = ?', (group_id,))
+        conn.execute('DROP INDEX IF EXISTS GroupDigest')
+    return len(duplicates)
+
+
+def stored_group_encoding(dbname):
+    """The encoding of the groups in a database's PermGroup.repr, None if it can't tell."""
+    # Symbolic groups (S<m>, A<m>) are the same in every encoding. A
+    # database with none of the others is told apart by the column's type,
+    # which was TEXT before the binary encoding.
+    with sqlite3.connect(dbname) as conn:
+        types = {row[1]: row[2] for row in conn.execute('PRAGMA table_info(PermGroup)')}
+        for group_repr, in conn.execute('SELECT repr FROM PermGroup'):
+            tag = str(group_repr)[:1]
+            if tag == '[':
+                return 'json'
+            if tag in ('R', 'L', 'B'):
+                return 'binary'
+    if types.get('repr', '').upper() == 'TEXT':
+        return 'json'
+    return None
+
+
+def stored_symmetric_kind(group_repr, size):
+    """('S', m) or ('A', m) if a group stored element by element is S_m or A_m."""
+    # S_m and A_m are the only groups whose elements have exactly the
+    # ranks of all and of the even permutations on m letters.
+    m = 2
+    while srz.factorial(m) < size:
+        m += 1
+    if srz.factorial(m) == size:
+        kind = 'S'
+    elif srz.factorial(m) == 2 * size and m > 2:
+        kind = 'A'
+    else:
+        return None
+    if group_repr[:1] == '[':
+        ranks = np.array(json.loads(group_repr), dtype=np.int64)
+    else:
+        ranks = srz.decode_group(group_repr)
+    if kind == 'S':
+        expected = np.arange(size, dtype=np.int64)
+    else:
+        expected = srz.alternating_ranks(m)
+    if np.array_equal(np.sort(ranks), expected):
+        return kind, m
+    return None
+
+
+def name_symmetric_groups(dbname):
+    """Store S_m and A_m by name in a database made before they were; the number of rows merged."""
+    # Rows for a group that is also stored by name are merged into the
+    # named row, and their trials point to it instead.
+    merged = 0
+    with sqlite3.connect(dbname) as conn:
+        types = {row[1]: row[2] for row in conn.execute('PRAGMA table_info(PermGroup)')}
+        as_text = types.get('repr', '').upper() == 'TEXT'
+        rows = conn.execute('SELECT PermGroup.id, PermGroup.repr, GroupClass.size '
+                            'FROM PermGroup JOIN GroupClass ON PermGroup.cls = GroupClass.id').fetchall()
+        named = {str(group_repr): group_id for group_id, group_repr, _ in rows
+                 if str(group_repr)[:1] in ('S', 'A')}
+        for group_id, group_repr, size in rows:
+            group_repr = str(group_repr)
+            if group_repr[:1] in ('S', 'A') or not size:
+                continue
+            symbolic = stored_symmetric_kind(group_repr, size)
+            if symbolic == None:
+                continue
+            name = srz.encode_symbolic_group(*symbolic)
+            conn.execute('DELETE FROM GroupElement WHERE grp = ?', (group_id,))
+            if name in named:
+                conn.execute('UPDATE Trial SET grp = ? WHERE grp = ?', (named[name], group_id))
+                conn.execute('DELETE FROM PermGroup WHERE id = ?', (group_id,))
+                merged += 1
+            else:
+                digest = sqlite3.Binary(srz.group_digest(name))
+                stored = name if as_text else sqlite3.Binary(name)
+                conn.execute('UPDATE PermGroup SET repr = ?, digest = ? WHERE id = ?',
+                             (stored, digest, group_id))
+                named[name] = group_id
+    return merged
+
+
+def stored_cycle_encoding(dbname):
+    """The encoding of the cycle counts in a database's Histogram.decomp, None if it has none."""
+    # Every group has the identity, whose cycle count is 1 as a product
+    # of prime powers and 0 as a partition rank. No product is 0.
+    with sqlite3.connect(dbname) as conn:
+        decomps = {row[0] for row in conn.execute('SELECT decomp FROM Histogram WHERE decomp IN (0, 1)')}
+    if 0 in decomps:
+        return 'partitions'
+    if 1 in decomps:
+        return 'primes'
+    return None
+
+
+def upgrade_db(dbname):
+    """Bring a database made by an earlier version up to the current schema."""
+    # Returns the number of groups merged into others, whose ids are gone.
+    add_group_digests(dbname)
+    merged = merge_duplicate_groups(dbname)
+    with sqlite3.connect(dbname) as conn:
+        conn.executescript(ddl.create)
+    return merged + name_symmetric_groups(dbname)
+
+
 class Experiment(object):
     """Store traversal groups of graphs on subsets of their nodes."""
     
@@ -201,21 +508,54 @@ class Experiment(object):
         with open(config, 'r') as file_in:
             self.config = json.load(file_in)
         db = self.config['db']
-        if not os.path.exists(db):
+        new_db = not os.path.exists(db)
+        stored = None if new_db else stored_group_encoding(db)
+        configured = self.config.get('group_encoding')
+        if stored != None and configured not in (None, stored):
+            msg = 'group_encoding is %r, but %s holds %r groups; using %r'
+            notify_now(msg % (configured, db, stored, stored))
+        self.group_encoding = stored or configured or 'binary'
+        stored = None if new_db else stored_cycle_encoding(db)
+        configured = self.config.get('cycle_encoding')
+        if stored != None and configured not in (None, stored):
+            msg = 'cycle_encoding is %r, but %s holds %r cycle counts; using %r'
+            notify_now(msg % (configured, db, stored, stored))
+        self.cycle_encoding = stored or configured or 'primes'
+        merged = 0
+        if new_db:
             init_db(db)
+        else:
+            merged = upgrade_db(db)
         engine = create_engine('sqlite:///%s' % db, echo=False)
         meta = MetaData()
         conn = engine.connect()
         self.handlers = {tbl: handlers[tbl](engine, meta, conn) for tbl in handlers}
+        encode, _ = srz.cycle_count_encodings[self.cycle_encoding]
+        for handler in self.handlers.itervalues():
+            handler.encode_cycle_count = encode
+        self.group_cache = GroupCache(maxsize=self.config.get('group_cache', 50000),
+                                      max_order=self.config.get('max_order'))
+        # Groups found by their generators in the result cache
+        self.stored_groups = 0
+        # Group ids and sizes from earlier runs on the same database
+        results = SharedCache if self.config.get('shared_cache') else PersistentCache
+        self.results = results(self.config.get('result_cache', '%s.cache' % db))
+        # Results may hold the ids of groups merged by upgrade_db
+        if new_db or merged:
+            self.results.clear()
+        if not len(self.results):
+            self.warm_results()
     
     def run(self):
         """Run the experiment."""
         trials = 0
         progress = ProgressTallier(self.config['secs'], 0)
         min_trials = self.config['min_trials']
+        # Exhaustive trials come first, then random ones
+        exhaustive = self.exhaustive_trials() if self.config.get('exhaustive') else iter(())
         while True:
             try:
-                self.add_data()
+                self.add_data(*next(exhaustive, ()))
                 trials += 1
                 progress.report(1)
             except KeyboardInterrupt:
@@ -229,73 +569,204 @@ class Experiment(object):
                         break
                 else:
                     break
+        self.results.close()
+        notify_now(self.group_cache.report(stored=self.stored_groups))
+        msg = 'Result cache: %s hits, %s misses'
+        notify_now(msg % (self.results.hits, self.results.misses))
+        notify_now('exists cache: %s' % (TableHandler.exists.cache_info(),))
     
-    def add_data(self):
+    def add_data(self, G=None, starting_nodes=None, methods=('bfs', 'dfs')):
         """Add data from a trial to the database."""
             
         # Graph
-        G = self.random_connected_graph()
+        if G == None:
+            G = self.random_connected_graph()
         graph_id = srz.graph_to_int(G)
         if not self.handlers['Graph'].exists(id=graph_id):
             self.handlers['Graph'].insert(G)
         
         # Subset of graph's nodes
         nodes = sorted(G.nodes)
-        starting_nodes, node_encoding = randobj.random_subsequence(nodes, encoding=True)
-        
-        methods = {'bfs': G.bfs, 'dfs': G.dfs}
-        for mtd, method in methods.iteritems():
+        if starting_nodes == None:
+            starting_nodes, node_encoding = randobj.random_subsequence(nodes, encoding=True)
+        else:
+            node_encoding = srz.set_to_int(starting_nodes)
         
-            # PermGroup
-            group = generate_group(method, starting_nodes)
-            group_repr = srz.encode_objects(group, srz.perm_to_int)
-            group_id = self.handlers['PermGroup'].exists(repr=group_repr)
+        n = len(nodes)
+        for mtd in methods:
             
+            # PermGroup, from an earlier trial, or an estimate of it for large graphs
+            trial_key = 'trial', graph_id, node_encoding, mtd
+            group_id, _ = self.results.get(trial_key, (None, None))
+            estimate = None
             if group_id == None:
-                
-                # Permutation
-                for perm in group:
-                    perm_id = srz.perm_to_int(perm)
-                    if self.handlers['Permutation'].exists(id=perm_id) == None:
-                        self.handlers['Permutation'].insert(perm)
-                
-                # GroupClass
-                group_class = fctn.get_fingerprint(group)
-                group_class_repr = srz.encode_group_class(group_class)
-                group_class_id = self.handlers['GroupClass'].exists(repr=group_class_repr)
-                
-                if group_class_id == None:
-                
-                    group_class_id = self.handlers['GroupClass'].insert(group_class)[0][0]
-                    
-                    # Histogram
-                    histogram = {'id': group_class_id, 'fingerprint': group_class}
-                    self.handlers['Histogram'].insert(histogram)
-                
-                group_data = {'repr': group_repr, 'cls': group_class_id}
-                group_id = self.handlers['PermGroup'].insert(group_data)[0][0]
-                
-                # GroupElement
-                self.handlers['GroupElement'].insert({'id': group_id, 'elements': group})
-                
+                perms = traversal_permutations(G.traversal_matrix(mtd, starting_nodes))
+                kind = fctn.symmetric_or_alternating(perms, n)
+                if kind == None and n > self.config.get('estimate_above', n):
+                    samples = self.config.get('estimate_samples', 1000)
+                    stride = self.config.get('estimate_stride', 10)
+                    estimate = fctn.estimate_group(perms, n=n, samples=samples, stride=stride)
+                else:
+                    group_id, size = self.cached_group(perms, n, kind=kind)
+                    if group_id != None:
+                        self.results.put(trial_key, (group_id, size))
+            
             # Trial
             trial_data = {
                 'graph': graph_id, 'nodes': node_encoding,
                 'method': mtd, 'grp': group_id
             }
-            self.handlers['Trial'].insert(trial_data)
+            trial_id = self.handlers['Trial'].insert(trial_data)[0][0]
+            
+            # Estimate
+            if estimate != None:
+                estimate_data = {'trial': trial_id, 'estimate': estimate}
+                estimate_id = self.handlers['Estimate'].insert(estimate_data)[0][0]
+                
+                # EstimateHistogram
+                histogram = {'id': estimate_id, 'fingerprint': estimate.fingerprint}
+                self.handlers['EstimateHistogram'].insert(histogram)
+    
+    def generators_key(self, perms, n):
+        """The result cache key for the group generated by permutations of n letters."""
+        _, ranks = self.group_cache.key(perms, n)
+        return 'gens', n, sorted(ranks)
+    
+    def cached_group(self, perms, n, kind=None):
+        """The id and size of the group generated by traversal permutations, added if it's new."""
+        # With a shared result cache, only one worker adds a given group.
+        added = []
+        def add():
+            added.append(True)
+            group_id, size = self.add_group(perms, n, kind=kind)
+            return (group_id, size) if group_id != None else None
+        result = self.results.get_or_compute(self.generators_key(perms, n), add)
+        if not added:
+            self.stored_groups += 1
+        return result or (None, None)
+    
+    def warm_results(self):
+        """Store the group ids and sizes of the trials already in the database."""
+        trial = self.handlers['Trial'].table
+        group = self.handlers['PermGroup'].table
+        group_class = self.handlers['GroupClass'].table
+        columns = [trial.c.graph, trial.c.nodes, trial.c.method, trial.c.grp, group_class.c.size]
+        s = select(columns, distinct=True).where(
+            and_(trial.c.grp == group.c.id, group.c.cls == group_class.c.id))
+        rows = self.handlers['Trial'].conn.execute(s)
+        self.results.put_many(
+            (('trial', graph, nodes, mtd), (group_id, size))
+            for graph, nodes, mtd, group_id, size in rows)
+        self.results.commit()
+    
+    def add_group(self, perms, n, kind=None):
+        """Add the group generated by traversal permutations if it's new; get its id and size."""
+        
+        # kind is 'S' or 'A' if the group is already known to be S_n or A_n.
+        # Groups with more than max_order elements are abandoned (id None).
+        group, symbolic = None, None
+        if kind != None:
+            symbolic = kind, n
+        else:
+            mode = self.config.get('closure', 'chain')
+            max_order = self.config.get('max_order')
+            table = self.table(n)
+            if max_order != None:
+                generate = lambda perms: stream_group(perms, max_order)
+            else:
+                generate = lambda perms: generate_group(perms, mode=mode, table=table)
+            group = self.group_cache.get(perms, n, generate)
+            if group == None:
+                return None, None
+            symbolic = symmetric_kind(len(group), fctn.support_degree(perms))
+        if symbolic != None:
+            # S_m and A_m are stored by name rather than element by element
+            kind, m = symbolic
+            size = srz.factorial(m) / (2 if kind == 'A' else 1)
+            group = None
+            group_repr = srz.encode_symbolic_group(*symbolic)
+        else:
+            size = len(group)
+            group_repr = self.encode_group(group)
+        group_id = self.handlers['PermGroup'].exists(repr=group_repr)
+        
+        if group_id == None:
+            
+            # Permutation
+            if group != None:
+                exists = self.handlers['Permutation'].exists
+                new_perms = [perm for perm in group if exists(id=srz.perm_to_int(perm)) == None]
+                self.handlers['Permutation'].insert(new_perms)
+            
+            # GroupClass
+            if group == None:
+                kind, m = symbolic
+                group_class = fctn.symmetric_fingerprint(m, alternating=kind == 'A')
+            else:
+                group_class = get_fingerprint(group, table=table)
+            group_class_repr = srz.encode_group_class(group_class)
+            group_class_id = self.handlers['GroupClass'].exists(repr=group_class_repr)
+            
+            if group_class_id == None:
+            
+                group_class_id = self.handlers['GroupClass'].insert(group_class)[0][0]
+                
+                # Histogram
+                histogram = {'id': group_class_id, 'fingerprint': group_class}
+                self.handlers['Histogram'].insert(histogram)
+            
+            group_data = {'repr': group_repr, 'cls': group_class_id}
+            try:
+                group_id = self.handlers['PermGroup'].insert(group_data)[0][0]
+            except IntegrityError:
+                # Another worker added the group after it was looked up
+                return self.handlers['PermGroup'].exists(repr=group_repr), size
+            
+            # GroupElement
+            if group != None:
+                self.handlers['GroupElement'].insert({'id': group_id, 'elements': group})
+        
+        return group_id, size
+
+    def encode_group(self, group):
+        """The PermGroup repr of a group, in the database's encoding."""
+        srz.cache_ranks(group)
+        if self.group_encoding == 'json':
+            return srz.encode_objects(group, srz.perm_to_int)
+        return srz.encode_group([srz.perm_to_int(perm) for perm in group])
+
+    def clique_numbers(self):
+        """The clique numbers of the graphs in the database, by graph id."""
+        table = self.handlers['Graph'].table
+        rows = self.handlers['Graph'].conn.execute(select([table.c.id, table.c.nodes])).fetchall()
+        return dict(zip([graph_id for graph_id, _ in rows], g.clique_numbers(rows)))
+
+    def table(self, n):
+        """The multiplication table for S_n, if tables are configured and it's small enough."""
+        directory = self.config.get('tables')
+        if directory and n <= gt.max_n:
+            return gt.load(n, directory)
+        return None
 
     def node_distribution(self):
         """A probability distribution on {min_n, min_n+1, ..., max_n}."""
         
+        min_n = self.config['min_n']
+        max_n = self.config['max_n']
+        
+        # Exhaustive trials cover every graph on min_n nodes, so random
+        # trials are spread evenly over the larger graphs.
+        if self.config.get('exhaustive'):
+            if max_n == min_n:
+                return [1.0]
+            return [0.0] + [1.0 / (max_n - min_n)] * (max_n - min_n)
+        
         # The distribution is designed to ensure that min_n is picked at least
         # (# of connected graphs w/ min_n nodes) * (# of nonempty subsets of min_n elts)
         # times over a given number of trials with an approximate amount of certainty,
         # and that there is a sizable random sampling of connected graphs with k nodes,
         # min_n < k <= max_n.
         
-        min_n = self.config['min_n']
-        max_n = self.config['max_n']
         certainty = self.config['certainty']
         trials = self.config['min_trials']
 
@@ -352,6 +823,25 @@ class Experiment(object):
         distribution = [q * (c ** i) for i in xrange((max_n - min_n) + 1)]
         return distribution
 
+    def exhaustive_trials(self):
+        """Every connected graph on min_n nodes with every nonempty subset of its nodes."""
+        # Yields (graph, subset, methods) with only the methods that have
+        # no trial yet, so an interrupted run picks up where it left off.
+        n = self.config['min_n']
+        subsets = [(i, sorted(srz.int_to_set(i))) for i in xrange(1, 1 << n)]
+        trial = self.handlers['Trial'].table
+        conn = self.handlers['Trial'].conn
+        for code in g.connected_graph_codes(n):
+            s = select([trial.c.nodes, trial.c.method]).where(trial.c.graph == code)
+            recorded = {(nodes, str(mtd)) for nodes, mtd in conn.execute(s)}
+            G = None
+            for node_encoding, subset in subsets:
+                methods = tuple(mtd for mtd in ('bfs', 'dfs') if (node_encoding, mtd) not in recorded)
+                if methods:
+                    if G == None:
+                        G = g.BitGraph.from_int(code, n)
+                    yield G, subset, methods
+
     def random_connected_graph(self):
         """A random choice from the set of connected graphs with at least n nodes."""
         
@@ -365,8 +855,7 @@ class Experiment(object):
         
         distribution = self.node_distribution()
         size = randobj.pick(sizes, distribution)
-        nodes = range(1, size + 1)
-        return randobj.random_connected_graph(nodes)
+        return randobj.random_connected_bitgraph(size)
 
 
 def main(config='config.json'):
@@ -12,6 +12,8 @@ DROP TABLE IF EXISTS PermGroup;
 DROP TABLE IF EXISTS GroupElement;
 DROP TABLE IF EXISTS Histogram;
 DROP TABLE IF EXISTS Trial;
+DROP TABLE IF EXISTS Estimate;
+DROP TABLE IF EXISTS EstimateHistogram;
 
 CREATE TABLE IF NOT EXISTS Graph (
 	id INTEGER PRIMARY KEY, -- The graph encoded as an integer
@@ -22,7 +24,7 @@ CREATE TABLE IF NOT EXISTS Graph (
 
 CREATE TABLE IF NOT EXISTS Permutation (
 	id INTEGER PRIMARY KEY, -- The permutation encoded as an integer
-	cycle_decomp INTEGER -- The cycle decomposition count encoded as an integer
+	cycle_decomp INTEGER -- The cycle decomposition count encoded as an integer (see cycle_encoding)
 );
 
 /* Cycle decomposition histograms for groups, representation 1 */
@@ -37,11 +39,13 @@ CREATE UNIQUE INDEX IF NOT EXISTS GroupClassRepr ON GroupClass(repr);
 /* Groups of permutations, representation 1 */
 CREATE TABLE IF NOT EXISTS PermGroup (
 	id INTEGER PRIMARY KEY, -- Possibly arbitrary identifier
-	repr TEXT,              -- Unique JSON representation as a list of integers
+	repr BLOB,              -- Unique binary representation (serialize.encode_group),
+	                        -- or S<m> or A<m> for symmetric and alternating groups
+	digest BLOB,            -- 128-bit digest of repr (serialize.group_digest)
 	cls INTEGER REFERENCES GroupClass(id)
 );
 
-CREATE UNIQUE INDEX IF NOT EXISTS GroupRepr ON PermGroup(repr);
+CREATE UNIQUE INDEX IF NOT EXISTS UniqueGroup ON PermGroup(digest, repr);
 
 /* Groups of permutations, representation 2 */
 CREATE TABLE IF NOT EXISTS GroupElement (
@@ -55,7 +59,7 @@ CREATE INDEX IF NOT EXISTS ElementAccess ON GroupElement(elt);
 /* Cycle decomposition histograms for groups, representation 2 */
 CREATE TABLE IF NOT EXISTS Histogram (
 	id INTEGER REFERENCES GroupClass(id),
-	decomp INTEGER,         -- Sequence of integers encoded as an integer
+	decomp INTEGER,         -- Cycle decomposition count encoded as an integer (see cycle_encoding)
 	count INTEGER
 );
 
@@ -75,3 +79,27 @@ CREATE TABLE IF NOT EXISTS Trial (
 CREATE UNIQUE INDEX IF NOT EXISTS UniqueTrial ON Trial(graph, nodes, method, datetime);
 CREATE INDEX IF NOT EXISTS TrialTime ON Trial(datetime);
 
+/* Estimates of traversal groups too large to generate, from random elements */
+CREATE TABLE IF NOT EXISTS Estimate (
+	id INTEGER PRIMARY KEY, -- Arbitrary identifier
+	trial INTEGER REFERENCES Trial(id),
+	samples INTEGER,        -- Number of random group elements drawn
+	size REAL,              -- Estimated order of the group, NULL if no samples
+	                        -- repeated (then only size_low is known)
+	size_low REAL,
+	size_high REAL          -- NULL if unbounded
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS EstimateTrial ON Estimate(trial);
+
+/* Estimated cycle decomposition histograms, as shares of the group */
+CREATE TABLE IF NOT EXISTS EstimateHistogram (
+	id INTEGER REFERENCES Estimate(id),
+	decomp INTEGER,         -- Cycle decomposition count encoded as an integer (see cycle_encoding)
+	share REAL,
+	share_low REAL,
+	share_high REAL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS UniqueEstimateHistogram ON EstimateHistogram(id, decomp);
+